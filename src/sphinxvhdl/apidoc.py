@@ -0,0 +1,291 @@
+# apidoc.py: Generator of reference pages of VHDL entities and packages
+# Copyright (C) 2021 CESNET z.s.p.o.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""
+Generates one reStructuredText page per entity and per package parsed from the VHDL sources, similarly to
+``sphinx-apidoc``::
+
+    python -m sphinxvhdl.apidoc -o doc/source/vhdl path/to/sources ...
+
+Unlike the pages with the ``vhdl:auto...`` directives, the generated pages contain the documentation itself,
+so the documentation build does not need to parse the sources for them. A page is only written when its
+content changes, so an incremental Sphinx build only reads the pages of the changed objects again.
+"""
+
+import argparse
+import os
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from jinja2 import ChoiceLoader, DictLoader, Environment, FileSystemLoader
+
+from . import autodoc
+from .symbols import IdentifierTable, SymbolStore
+
+# First line of every generated page, files without it are never overwritten or removed
+HEADER = '.. Generated by python -m sphinxvhdl.apidoc, do not edit.'
+
+# Default templates, each of them can be overridden by a file of the same name in the template directory
+TEMPLATES = {
+    'entity.rst_t': """\
+{{ header }}
+
+{{ name | heading }}
+
+.. vhdl:entity:: {{ name }}
+{% if doc %}
+
+{{ doc | indent(3, true) }}
+{% endif %}
+{% if generics %}
+
+   .. vhdl:{{ 'auto' if groups }}generics:: {{ name }}
+{% if not groups %}
+
+{% for definition, doc in generics %}
+      {{ definition }}
+{% if doc %}
+{{ doc | indent(9, true) }}
+{% endif %}
+{% endfor %}
+{% endif %}
+{% endif %}
+{% if ports %}
+
+   .. vhdl:{{ 'auto' if groups }}ports:: {{ name }}
+{% if not groups %}
+
+{% for definition, doc in ports %}
+      {{ definition }}
+{% if doc %}
+{{ doc | indent(9, true) }}
+{% endif %}
+{% endfor %}
+{% endif %}
+{% endif %}
+""",
+    'package.rst_t': """\
+{{ header }}
+
+{{ name | heading }}
+
+.. vhdl:package:: {{ name }}
+{% if doc %}
+
+{{ doc | indent(3, true) }}
+{% endif %}
+{% for object in objects %}
+
+   .. vhdl:{{ object.directive }}:: {{ object.signature }}
+{% if object.doc %}
+
+{{ object.doc | indent(6, true) }}
+{% endif %}
+{% for signature, doc in object.members %}
+
+      .. vhdl:{{ object.member_directive }}:: {{ signature }}
+{% if doc %}
+
+{{ doc | indent(9, true) }}
+{% endif %}
+{% endfor %}
+{% endfor %}
+""",
+    'toc.rst_t': """\
+{{ header }}
+
+{{ title | heading }}
+
+.. toctree::
+   :maxdepth: {{ maxdepth }}
+
+{% for docname in docnames %}
+   {{ docname }}
+{% endfor %}
+""",
+}
+
+
+def heading(text: str, char: str = '=') -> str:
+    return f'{text}\n{char * len(text)}'
+
+
+def create_environment(template_dir: Optional[str] = None) -> Environment:
+    """
+    :param template_dir: directory with templates overriding the default ones
+    :return: the environment of the templates; a template is compiled once and reused for all the pages
+    """
+    loaders = [DictLoader(TEMPLATES)]
+    if template_dir is not None:
+        loaders.insert(0, FileSystemLoader(template_dir))
+    environment = Environment(loader=ChoiceLoader(loaders), trim_blocks=True, keep_trailing_newline=True,
+                              autoescape=False)
+    environment.filters['heading'] = heading
+    return environment
+
+
+def display_name(store: SymbolStore, key: str) -> str:
+    """
+    :param store: the parsed objects of the kind of the object
+    :param key: qualified name of the object
+    :return: the simple name of the object, or its qualified name if the simple one is ambiguous
+    """
+    name = key.rsplit('.', 1)[-1]
+    return name if len(store.by_name.get(name, ())) == 1 else key
+
+
+def definitions(store: Dict[str, List[str]]) -> List[Tuple[str, str]]:
+    return [(definition, '\n'.join(doc)) for definition, doc in store.items()]
+
+
+def entity_context(key: str) -> dict:
+    generics = autodoc.generics.get(key, {})
+    ports = autodoc.portsignals.get(key, {})
+    # Descriptions of groups are not part of the definitions, such entities are documented by the parser at build
+    groups = any(autodoc.groups_desc.get(x.split('}', 1)[0]) for x in [*generics, *ports] if '}' in x)
+    return {
+        'name': display_name(autodoc.entities, key),
+        'key': key,
+        'doc': '\n'.join(autodoc.entities[key]),
+        'generics': definitions(generics),
+        'ports': definitions(ports),
+        'groups': groups,
+    }
+
+
+def package_objects(key: str) -> Iterable[dict]:
+    """
+    :param key: qualified name of a package
+    :return: contexts of the objects declared directly in the package, in the order of the sources
+    """
+    def members(store: SymbolStore) -> Iterable[str]:
+        return [x for x in store if x.startswith(key + '.') and '.' not in x[len(key) + 1:]]
+
+    for record in members(autodoc.records):
+        yield {'directive': 'record', 'signature': display_name(autodoc.records, record),
+               'doc': '\n'.join(autodoc.records[record]), 'member_directive': 'recordelem',
+               'members': definitions(autodoc.record_elements.get(record, {}))}
+    for enum in members(autodoc.enums):
+        yield {'directive': 'enum', 'signature': display_name(autodoc.enums, enum),
+               'doc': '\n'.join(autodoc.enums[enum]), 'member_directive': 'enumval',
+               'members': definitions(autodoc.enumvals.get(enum, {}))}
+    for general_type in members(autodoc.types):
+        definition, doc = autodoc.types[general_type]
+        yield {'directive': 'type', 'signature': f'{display_name(autodoc.types, general_type)} : {definition}',
+               'doc': '\n'.join(doc), 'members': []}
+    for function in members(autodoc.functions):
+        return_type, doc = autodoc.functions[function]
+        yield {'directive': 'function', 'signature': f'{function.rsplit(".", 1)[-1]} {return_type or "Unknown"}',
+               'doc': '\n'.join(doc), 'members': []}
+
+
+def package_context(key: str) -> dict:
+    return {
+        'name': display_name(autodoc.packages, key),
+        'key': key,
+        'doc': '\n'.join(autodoc.packages[key]),
+        'objects': list(package_objects(key)),
+    }
+
+
+def render_pages(environment: Environment, tocfile: Optional[str], maxdepth: int = 1) -> Dict[str, str]:
+    """
+    Renders the pages of all the entities and packages in the parsed sources
+    :param environment: environment of the templates, see :py:func:`create_environment`
+    :param tocfile: name of the page with the table of contents of the generated pages, None to skip it
+    :param maxdepth: depth of the table of contents
+    :return: content of the pages keyed by their file names
+    """
+    pages = {}
+    entity_template = environment.get_template('entity.rst_t')
+    for key in autodoc.entities:
+        pages[f'{key}.rst'] = entity_template.render(header=HEADER, **entity_context(key))
+    package_template = environment.get_template('package.rst_t')
+    for key in autodoc.packages:
+        pages[f'{key}.rst'] = package_template.render(header=HEADER, **package_context(key))
+    if tocfile is not None:
+        pages[f'{tocfile}.rst'] = environment.get_template('toc.rst_t').render(
+            header=HEADER, title='VHDL Reference', maxdepth=maxdepth,
+            docnames=sorted(x[:-len('.rst')] for x in pages))
+    return pages
+
+
+def is_generated(path: str) -> bool:
+    try:
+        with open(path, encoding='utf-8') as page:
+            return page.readline().rstrip('\n') == HEADER
+    except OSError:
+        return False
+
+
+def write_pages(outdir: str, pages: Dict[str, str], force: bool = False, remove_old: bool = False) -> Tuple[int, int, int]:
+    """
+    Writes the pages whose content differs from the existing files
+    :param outdir: output directory
+    :param pages: content of the pages keyed by their file names
+    :param force: write all the pages, even the unchanged ones
+    :param remove_old: remove the pages generated before which are not generated anymore
+    :return: numbers of written, unchanged and removed pages
+    """
+    os.makedirs(outdir, exist_ok=True)
+    written = unchanged = removed = 0
+    for name, content in pages.items():
+        path = os.path.join(outdir, name)
+        if os.path.exists(path) and not is_generated(path):
+            print(f'Skip {path}, it was not generated by this tool.', file=sys.stderr)
+            continue
+        if not force:
+            try:
+                with open(path, encoding='utf-8') as page:
+                    if page.read() == content:
+                        unchanged += 1
+                        continue
+            except OSError:
+                pass
+        with open(path, 'w', encoding='utf-8') as page:
+            page.write(content)
+        written += 1
+
+    if remove_old:
+        for name in sorted(os.listdir(outdir)):
+            path = os.path.join(outdir, name)
+            if name.endswith('.rst') and name not in pages and is_generated(path):
+                os.remove(path)
+                removed += 1
+    return written, unchanged, removed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m sphinxvhdl.apidoc',
+                                     description='Generates reference pages of VHDL entities and packages.')
+    parser.add_argument('-o', '--output-dir', required=True, help='directory of the generated pages')
+    parser.add_argument('-l', '--library', action='append', default=[], metavar='NAME=DIR',
+                        help='library of the sources in a directory, see vhdl_autodoc_libraries')
+    parser.add_argument('-t', '--templatedir', help='directory with templates overriding the default ones')
+    parser.add_argument('--tocfile', default='vhdl', help='name of the page with the table of contents')
+    parser.add_argument('-T', '--no-toc', action='store_true', help='do not generate the table of contents')
+    parser.add_argument('-d', '--maxdepth', type=int, default=1, help='depth of the table of contents')
+    parser.add_argument('-f', '--force', action='store_true', help='write also the unchanged pages')
+    parser.add_argument('--remove-old', action='store_true',
+                        help='remove the generated pages of the objects which were not found anymore')
+    parser.add_argument('sources', nargs='+', help='directories or manifests with the VHDL sources')
+    args = parser.parse_args(argv)
+
+    libraries: Dict[str, List[str]] = {}
+    for library in args.library:
+        name, _, path = library.partition('=')
+        if not path:
+            parser.error(f'invalid library {library}, expected NAME=DIR')
+        libraries.setdefault(name, []).append(path)
+
+    autodoc.init(args.sources, IdentifierTable(), libraries)
+    pages = render_pages(create_environment(args.templatedir), None if args.no_toc else args.tocfile, args.maxdepth)
+    written, unchanged, removed = write_pages(args.output_dir, pages, args.force, args.remove_old)
+    print(f'{written} page(s) written, {unchanged} unchanged, {removed} removed in {args.output_dir}.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
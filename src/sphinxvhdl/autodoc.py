@@ -6,26 +6,103 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
 import glob
-from collections import defaultdict
+import hashlib
+import json
 import os
-from typing import Optional, List
+import re
+from typing import Dict, Iterable, NamedTuple, Optional, List, Tuple, Union
 from enum import Enum, auto
 
 from sphinx.util import logging
+
+from . import manifest
+from .symbols import IdentifierTable, SymbolStore
+
 logger = logging.getLogger(__name__)
 
-entities = {}
-portsignals = defaultdict(dict)
+# Set once the sources of the current application have been parsed; the parsed data are not part of the pickled
+# environment and are reset when another application is initialized in this process
+initialized = False
+# Sources listed before the documents are read, see collect_sources(); they are listed by init() if None
+sources = None
+
+# Library of the sources which are not assigned to any library by the configuration
+DEFAULT_LIBRARY = 'work'
+
+# Parsed objects keyed by case-folded qualified names, `library.entity` or `library.package.name`
+entities = SymbolStore()
+portsignals = SymbolStore(dict)
 groups_desc = {}
-constants = defaultdict(dict)
-generics = defaultdict(dict)
-packages = {}
-records = {}
-record_elements = defaultdict(dict)
-enums = {}
-enumvals = defaultdict(dict)
-types = {}
-functions = {}
+constants = SymbolStore(dict)
+generics = SymbolStore(dict)
+packages = SymbolStore()
+records = SymbolStore()
+record_elements = SymbolStore(dict)
+enums = SymbolStore()
+enumvals = SymbolStore(dict)
+types = SymbolStore()
+functions = SymbolStore()  # (return type, documentation)
+instances = SymbolStore(list)  # instantiated units of an entity's architectures: (label, case-folded unit name)
+# Type expressions of ports and generics split into segments, keyed by the entity and the definition;
+# each segment is (text, None, None) or a link (text, 'type', qualified type name) or (text, 'gengeneric', generic name)
+type_links = SymbolStore(dict)
+generic_names = {}  # case-folded names of the generics of each entity, used while linking the type expressions
+
+# Instantiation of an entity or a component, e.g. `u0: entity work.foo(full)`, `u1: component bar` or `u2: baz`,
+# optionally followed by its maps or terminated by a semicolon
+INSTANCE_RE = re.compile(
+    r'^(\w+)\s*:\s*(?:entity\s+([\w.]+)(?:\s*\(\s*\w+\s*\))?|component\s+(\w+)|(\w+))\s*'
+    r'(?:((?:generic|port)\s+map\b.*)|(;))?$')
+MAP_RE = re.compile(r'^(?:generic|port)\s+map\b')
+# Reserved words which may follow a label and do not start an instantiation
+NON_INSTANCE_WORDS = {'process', 'block', 'for', 'if', 'case', 'with', 'assert', 'postponed', 'entity', 'component',
+                      'while', 'loop', 'next', 'exit', 'return', 'null', 'wait', 'report'}
+
+# Start of a design unit, where the parser resynchronizes, e.g. `entity foo is` or `package body bar is`
+UNIT_START_RE = re.compile(r'^(entity|architecture|package|configuration|context)\s+(body\s+)?\w+.*\bis\b')
+# Instantiation of a generic package, e.g. `package p_inst is new work.gen_pkg generic map (W => 8);`
+PACKAGE_INSTANCE_RE = re.compile(r'^package\s+\w+\s+is\s+new\b')
+
+
+class Diagnostic(NamedTuple):
+    filename: str
+    lineno: int
+    unit: str  # kind and name of the design unit, e.g. `entity foo`
+    message: str
+
+
+# Problems found while parsing the sources
+diagnostics: List[Diagnostic] = []
+
+
+def report(filename: str, lineno: int, unit: str, message: str) -> None:
+    """
+    Records a problem found while parsing a source and warns about it
+    """
+    diagnostics.append(Diagnostic(filename, lineno, unit, message))
+    logger.warning(f"SPHINX-VHDL: {message}", location=f"{filename}:{lineno}")
+
+
+def write_diagnostics(path: str) -> None:
+    """
+    Writes the problems found while parsing the sources as a JSON list of objects with the fields
+    of :py:class:`Diagnostic`
+    """
+    with open(path, 'w', encoding='utf-8') as report_file:
+        json.dump([x._asdict() for x in diagnostics], report_file, indent=2)
+        report_file.write('\n')
+
+
+def is_package_end(line_lowercase: str, name: str, is_body: bool) -> bool:
+    """
+    :param line_lowercase: line of the source in lowercase
+    :param name: case-folded name of the innermost open package
+    :param is_body: True if the package is a package body, where a bare `end;` ends a subprogram instead
+    :return: True if the line is `end <name>;`, or `end;` in a package declaration
+    """
+    words = line_lowercase.split('--')[0].replace(';', ' ; ').split()
+    return words == ['end', name, ';'] or (not is_body and words == ['end', ';'])
+
 
 # Function for parsing line comments
 def parse_inline_doc_or_print_error(current_doc, filename, line, lineno):
@@ -48,223 +125,622 @@ class ParseState(Enum):
     ENUM = auto()
 
 
-def init(path) -> None:
-
+# States which have to be left before the start of the next design unit
+UNTERMINATED_STATES = {ParseState.ENTITY_DECL, ParseState.PORT, ParseState.GENERIC, ParseState.GROUPS,
+                       ParseState.RECORD, ParseState.ENUM}
+
+
+# Identifiers in type expressions, possibly selected names such as `pkg.t_word`
+IDENTIFIER_RE = re.compile(r'[a-z]\w*(?:\.[a-z]\w*)*', re.IGNORECASE)
+
+
+def join_declaration(parts: List[str]) -> str:
+    """
+    :param parts: code of the lines of a declaration spanning several lines
+    :return: the declaration on a single line
+    """
+    declaration = ' '.join(x for x in parts if x)
+    return re.sub(r'\(\s+', '(', re.sub(r'\s+\)', ')', declaration))
+
+
+def strip_list_end(definition: str) -> str:
+    """
+    :param definition: definition of the last port or generic, possibly followed by the end of the list
+    :return: the definition without the closing parentheses of the port or generic list
+    """
+    while definition.endswith(')') and definition.count(')') > definition.count('('):
+        definition = definition[:-1].rstrip()
+    return definition
+
+
+def store_declaration(state: ParseState, declaration: str, group: str, entity_key: str, doc: List[str]) -> None:
+    """
+    Stores a complete port or generic declaration
+    :param state: PORT or GENERIC
+    :param declaration: code of the declaration, on a single line
+    :param group: name of the group of the declaration, or an empty string
+    :param entity_key: case-folded qualified name of the entity
+    :param doc: documentation of the declaration
+    """
+    if state == ParseState.PORT:
+        definition = strip_list_end(declaration.split(';')[0].split(':=')[0].strip())
+        if definition.lower().startswith('signal'):
+            definition = definition[6:].strip()
+        store = portsignals
+    else:
+        definition = strip_list_end(declaration.split(';')[0].strip())
+        if ':=' not in definition:
+            definition += ':= UNDEFINED'
+        if definition.lower().startswith('constant'):
+            definition = definition[8:].strip()
+        store = generics
+    if group != "":
+        definition = group + "}" + definition
+    store[entity_key][definition] = doc
+
+
+def declaration_type(definition: str, is_port: bool) -> str:
+    """
+    :param definition: stored definition of a port or generic
+    :param is_port: True for ports, whose type follows their mode
+    :return: the type expression of the port or generic, as shown by the ports and generics directives
+    """
+    definition = definition.split('}', 1)[-1]
+    if is_port:
+        return definition.split(':', 1)[1].strip().split(maxsplit=1)[1]
+    return definition.split(':', 1)[1].split(':=')[0].strip()
+
+
+def link_type(expression: str, entity_key: str, symbols: IdentifierTable) -> Tuple[Tuple[str, Optional[str], Optional[str]], ...]:
+    """
+    Splits a type expression into text and the names of the parsed types and of the generics of the entity
+    :param expression: the type expression
+    :param entity_key: case-folded qualified name of the entity of the port or generic
+    :param symbols: identifier table used to fold the names
+    :return: segments of the expression, see :py:data:`type_links`
+    """
+    segments = []
+    position = 0
+    entity_generics = generic_names.get(entity_key, ())
+    for match in IDENTIFIER_RE.finditer(expression):
+        name = symbols.fold(match.group())
+        if name in entity_generics:
+            link = 'gengeneric', match.group()
+        else:
+            for store in (types, records, enums):
+                target = store.lookup(name)
+                if target is not None:
+                    link = 'type', target
+                    break
+            else:
+                continue
+        if match.start() > position:
+            segments.append((expression[position:match.start()], None, None))
+        segments.append((match.group(), *link))
+        position = match.end()
+    if position < len(expression):
+        segments.append((expression[position:], None, None))
+    return tuple(segments)
+
+
+def link_types(symbols: IdentifierTable) -> None:
+    """
+    Resolves the names in the type expressions of all the parsed ports and generics, see :py:data:`type_links`
+    """
+    type_links.clear()
+    generic_names.clear()
+    for entity_key, definitions in generics.items():
+        generic_names[entity_key] = {symbols.fold(x.split('}', 1)[-1].split(':')[0].strip()) for x in definitions}
+    for store, is_port in ((portsignals, True), (generics, False)):
+        for entity_key, definitions in store.items():
+            for definition in definitions:
+                try:
+                    expression = declaration_type(definition, is_port)
+                except IndexError:
+                    continue
+                type_links[entity_key][definition] = link_type(expression, entity_key, symbols)
+
+
+def source_library(filename: str, libraries: Dict[str, Union[str, List[str]]]) -> str:
+    """
+    :param filename: path of a VHDL source file
+    :param libraries: mapping of library names to directories (or lists of directories) with their sources
+    :return: the case-folded name of the library the file is compiled into, the most specific directory wins
+    """
+    filename = os.path.abspath(filename)
+    library = DEFAULT_LIBRARY
+    matched_length = -1
+    for name, paths in libraries.items():
+        for library_path in (paths if isinstance(paths, list) else [paths]):
+            library_path = os.path.abspath(library_path)
+            if filename.startswith(library_path + os.sep) and len(library_path) > matched_length:
+                library = name.lower()
+                matched_length = len(library_path)
+    return library
+
+
+def collect_sources(path, libraries: Optional[Dict[str, Union[str, List[str]]]] = None) -> Tuple[List[Tuple[str, str]], str]:
+    """
+    Lists the VHDL sources to parse. Directories are searched recursively for ``*.vhd`` and ``*.vhdl``
+    files, files are read as manifests listing the sources in the compile order, see :py:mod:`.manifest`.
+    :param path: directory or manifest, or a list of them
+    :param libraries: mapping of library names to directories with their sources, see :py:func:`source_library`;
+        used for the sources whose library is not given by their manifest
+    :return: pairs of a source path and its library, and a digest of the manifests and the sources used to detect
+        changes of the parse input
+    """
     if isinstance(path, list):
         path_list = path
     else:
         path_list = [path]
 
-    for dir in path_list:
-        for filename in (
-                glob.glob(os.path.join(dir, "**", "*.vhd"), recursive=True) + glob.glob(os.path.join(dir, "**", "*.vhdl"),
-                                                                                        recursive=True)):
-            try:
-                source_file = open(filename, 'r')
-                source_code = source_file.readlines()
-            except UnicodeDecodeError:
-                logger.warning(f"SPHINX-VHDL: Skip VHDL file: {filename} due to UnicodeDecodeError. Use UTF-8 encoding please.")
-                continue
-            except:
-                logger.warning(f"SPHINX-VHDL: Skip VHDL file: {filename} due to unexpected error.")
-                continue
-
-            logger.debug(f"SPHINX-VHDL: Start parsing VHDL file: {filename}")
+    if libraries is None:
+        libraries = {}
 
-            current_doc = []
-            current_entity = '' # Name of the enetity
-            current_constant = '' # Name of the constant
-            current_group = '' # Name of the group
-            group_definition = '' # Description of group of ports or generics
-            current_package = ''
-            current_type_name = ''  # record or enum
-            state: Optional[ParseState] = None
-            group_state: Optional[ParseState] = None
-            open_parentheses = 0
-            lineno = 0
-            for line in source_code:
-                lineno += 1
-                line = line.strip()
-                line_lowercase = line.lower()
-                # Group parsing logic
-                if state == ParseState.PORT and group_state == ParseState.GENERIC:
-                    current_group = ""
-
-                # Line comments logic
-                if line_lowercase.startswith('-- '):
-                    # Logic for sampling names of groups of ports and generics
-                    if (state == ParseState.PORT or state == ParseState.GENERIC) and '====' in line_lowercase:
-                        group_state = state
-                        state = ParseState.GROUPS
-                        current_group = ""
-                        current_doc = []
-                    elif state == ParseState.GROUPS and current_group != '' and '====' not in line_lowercase:
-                        current_doc.append(line[3:])
-                    elif state == ParseState.GROUPS and '====' not in line_lowercase:
-                        current_group = current_entity + " " + line[3:].strip()
-                        current_doc = []
-                    elif state == ParseState.GROUPS and '====' in line_lowercase:
-                        group_definition = current_doc
-                        groups_desc[current_group] = group_definition
-                        state = group_state
+    digest = hashlib.sha256()
+    sources = []
+    for dir in path_list:
+        if manifest.is_manifest(dir):
+            listed = manifest.read_manifest(dir)
+            for content in listed.contents:
+                digest.update(content)
+            for filename, library in listed.sources:
+                sources.append((filename, library if library is not None else source_library(filename, libraries)))
+        else:
+            # Sorted, as the order of the files found by glob depends on the file system
+            for filename in sorted(
+                    glob.glob(os.path.join(dir, "**", "*.vhd"), recursive=True) + glob.glob(os.path.join(dir, "**", "*.vhdl"),
+                                                                                            recursive=True)):
+                sources.append((filename, source_library(filename, libraries)))
+
+    listed_files = set()
+    unique_sources = []
+    for filename, library in sources:
+        if filename in listed_files:
+            continue
+        listed_files.add(filename)
+        unique_sources.append((filename, library))
+        digest.update(f'{filename}\0{library}\0'.encode())
+        try:
+            stat = os.stat(filename)
+            digest.update(f'{stat.st_mtime_ns}\0{stat.st_size}\n'.encode())
+        except OSError:
+            digest.update(b'\n')
+    return unique_sources, digest.hexdigest()
+
+
+def init(path, symbols: Optional[IdentifierTable] = None, libraries: Optional[Dict[str, Union[str, List[str]]]] = None,
+         sources: Optional[List[Tuple[str, str]]] = None) -> None:
+    """
+    Parses all the VHDL sources found in the given directories and manifests
+    :param path: directory or manifest, or a list of them, see :py:func:`collect_sources`
+    :param symbols: identifier table used to fold the names of the parsed objects
+    :param libraries: mapping of library names to directories with their sources, see :py:func:`source_library`
+    :param sources: sources already listed by :py:func:`collect_sources`, they are listed again if None
+    """
+    if symbols is None:
+        symbols = IdentifierTable()
+
+    if sources is None:
+        sources = collect_sources(path, libraries)[0]
+
+    diagnostics.clear()
+    for filename, library in sources:
+        parse_source(filename, library, symbols)
+
+    link_types(symbols)
+    report_summary()
+
+
+def parse_source(filename: str, library: str, symbols: IdentifierTable) -> None:
+    """
+    Reads and parses one VHDL source, the problems of the file are reported and do not stop the caller
+    :param filename: path of the file
+    :param library: case-folded name of the library the file is compiled into
+    :param symbols: identifier table used to fold the names of the parsed objects
+    """
+    try:
+        source_file = open(filename, 'r')
+        source_code = source_file.readlines()
+    except UnicodeDecodeError:
+        logger.warning(f"SPHINX-VHDL: Skip VHDL file: {filename} due to UnicodeDecodeError. Use UTF-8 encoding please.")
+        return
+    except:
+        logger.warning(f"SPHINX-VHDL: Skip VHDL file: {filename} due to unexpected error.")
+        return
+
+    # A file which cannot be parsed must not stop the parsing of the others
+    try:
+        parse_file(filename, source_code, library, symbols)
+    except Exception as e:
+        report(filename, 0, 'file', f"Skip the rest of VHDL file: {filename} due to {type(e).__name__}: {e}")
+
+
+def report_summary() -> None:
+    if diagnostics:
+        logger.info(f"SPHINX-VHDL: {len(diagnostics)} problem(s) found in "
+                    f"{len({x.filename for x in diagnostics})} VHDL file(s).")
+
+
+def uses_digest(uses: Iterable[Tuple[str, str]]) -> str:
+    """
+    :param uses: pairs of the name of a store, see :py:func:`parsed_stores`, and of a case-folded name
+        looked up in it by a document
+    :return: digest of the parsed objects the names resolve to, including their ports, generics, members and
+        linked types, and of the other candidates of ambiguous names
+    """
+    stores = dict(parsed_stores(), type_links=type_links)
+    digest = hashlib.sha256()
+    for store_name, name in sorted(uses):
+        candidates = stores[store_name].candidates(name)
+        digest.update(json.dumps([store_name, name, candidates]).encode())
+        if not candidates:
+            continue
+        key = candidates[0]
+        for other_name, store in stores.items():
+            if key in store:
+                digest.update(json.dumps([other_name, store[key]]).encode())
+        groups = {x.split('}', 1)[0] for x in [*portsignals.get(key, ()), *generics.get(key, ())] if '}' in x}
+        for group in sorted(groups):
+            digest.update(json.dumps([group, groups_desc.get(group)]).encode())
+    return digest.hexdigest()
+
+
+def parsed_stores() -> Dict[str, dict]:
+    """
+    :return: the stores of the objects parsed from the sources, keyed by their names
+    """
+    return {
+        'entities': entities,
+        'portsignals': portsignals,
+        'groups_desc': groups_desc,
+        'constants': constants,
+        'generics': generics,
+        'packages': packages,
+        'records': records,
+        'record_elements': record_elements,
+        'enums': enums,
+        'enumvals': enumvals,
+        'types': types,
+        'functions': functions,
+        'instances': instances,
+    }
+
+
+def clear_stores() -> None:
+    """
+    Forgets all the parsed objects and the problems found in the sources
+    """
+    for store in parsed_stores().values():
+        store.clear()
+    diagnostics.clear()
+
+
+def dump_stores() -> dict:
+    """
+    :return: the parsed objects and the problems found in the sources as a JSON-serializable dictionary
+    """
+    data = {name: dict(store) for name, store in parsed_stores().items()}
+    data['diagnostics'] = [list(x) for x in diagnostics]
+    return data
+
+
+def load_stores(dumps: Iterable[dict], symbols: IdentifierTable) -> None:
+    """
+    Replaces the parsed objects by the ones from dumps of :py:func:`dump_stores`, e.g. of the individual sources.
+    The dumps are merged in the given order the same way as the parser merges the objects of its sources.
+    :param dumps: the dumped objects
+    :param symbols: identifier table used to link the type expressions, see :py:func:`link_types`
+    """
+    clear_stores()
+    for data in dumps:
+        for name, store in parsed_stores().items():
+            factory = getattr(store, 'default_factory', None)
+            for key, value in data[name].items():
+                if factory is dict:
+                    store[key].update(value)
+                elif factory is list:
+                    store[key].extend(tuple(x) for x in value)
+                elif name in ('types', 'functions'):
+                    store[key] = tuple(value)
+                else:
+                    store[key] = value
+        diagnostics.extend(Diagnostic(*x) for x in data['diagnostics'])
+    link_types(symbols)
+
+
+def parse_file(filename: str, source_code: List[str], library: str, symbols: IdentifierTable) -> None:
+    """
+    Extracts the documentation of the objects declared in one VHDL source file
+    :param filename: path of the file used in messages
+    :param source_code: lines of the file
+    :param library: case-folded name of the library the file is compiled into
+    :param symbols: identifier table used to fold the names of the parsed objects
+    """
+    logger.debug(f"SPHINX-VHDL: Start parsing VHDL file: {filename}")
+
+    current_doc = []
+    current_entity = '' # Name of the enetity
+    current_entity_key = '' # Case-folded name of the entity
+    current_constant = '' # Name of the constant
+    current_architecture_key = '' # Case-folded qualified name of the entity of the architecture
+    pending_instance = None # Label and unit name of an instantiation whose port or generic map has not been seen yet
+    current_group = '' # Name of the group
+    group_definition = '' # Description of group of ports or generics
+    current_package = ''
+    package_ends = [] # Name of each open package and whether it is a package body, to recognize `end <name>;`
+    current_scope = library # Case-folded qualified name of the current package, or the library outside of packages
+    current_type_name = ''  # record or enum
+    state: Optional[ParseState] = None
+    group_state: Optional[ParseState] = None
+    open_parentheses = 0
+    pending_declaration = None # Code of the lines of a port or generic declaration which continues on the next line
+    pending_depth = 0 # Parentheses opened by the pending declaration
+    current_unit = 'file' # Kind and name of the design unit, for diagnostics
+    skipping = False # Set after a parse error until the start of the next design unit
+    lineno = 0
+    for line in source_code:
+        lineno += 1
+        line = line.strip()
+        line_lowercase = line.lower()
+        # Resynchronization at the start of a design unit, the state left by a misparsed unit must not leak into it
+        unit_match = UNIT_START_RE.match(line_lowercase)
+        if unit_match is not None:
+            terminated = state not in UNTERMINATED_STATES and open_parentheses == 0 and \
+                not (state == ParseState.PACKAGE and (unit_match.group(1) != 'package' or unit_match.group(2) is not None))
+            if not terminated and not skipping:
+                report(filename, lineno, current_unit, f"{current_unit} is not terminated properly, "
+                                                       f"its documentation may be incomplete")
+            if not terminated or skipping or state == ParseState.ARCH_DECL:
+                state = None
+                group_state = None
+                open_parentheses = 0
+                pending_declaration = None
+                current_package = ''
+                package_ends = []
+                current_scope = library
+                current_group = ''
+            skipping = False
+            current_unit = f'{unit_match.group(1)} {line.split()[2 if unit_match.group(2) else 1]}'
+        if skipping:
+            # Only the documentation of the next design unit is collected
+            if line_lowercase.startswith('-- '):
+                current_doc.append(line[3:])
+            elif line_lowercase == '--':
+                current_doc.append('')
+            else:
+                current_doc = []
+            continue
+
+        # Instantiations are only looked for in architectures
+        instance_match = None
+        if state == ParseState.ARCH_DECL:
+            instance_match = INSTANCE_RE.match(line_lowercase.split('--')[0].strip())
+
+        # An instantiation without the entity/component keyword is confirmed by its port or generic map
+        if pending_instance is not None and line_lowercase and not line_lowercase.startswith('--'):
+            if MAP_RE.match(line_lowercase):
+                instances[current_architecture_key].append(pending_instance)
+            pending_instance = None
+
+        try:
+            # Group parsing logic
+            if state == ParseState.PORT and group_state == ParseState.GENERIC:
+                current_group = ""
+
+            # Continuation of a port or generic declaration which spans several lines
+            if pending_declaration is not None and state in (ParseState.PORT, ParseState.GENERIC):
+                if not line_lowercase.startswith('--'):
+                    code = line.split('--')[0]
+                    pending_declaration.append(code.strip())
+                    pending_depth += code.count('(') - code.count(')')
+                    if len(current_doc) == 0:
+                        parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
+                    if pending_depth <= 0:
+                        store_declaration(state, join_declaration(pending_declaration), current_group, current_entity_key,
+                                          current_doc)
+                        pending_declaration = None
                         current_doc = []
-                    else:
-                        current_doc.append(line[3:])
-
-                # If line start with keyword architecture then save name of architecture
-                elif line_lowercase.startswith('architecture'):
-                    state = ParseState.ARCH_DECL
-                    current_constant = line.split()[3]
-
-                # If line contains keyword constant and state is not generice then start to collecting constants
-                elif state == ParseState.ARCH_DECL and 'constant' in line_lowercase:
-                    parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
-                    definition = line.split('--')[0].split(';')[0]
-                    if ':=' not in definition:
-                        definition += ':= UNDEFINED'
-                    definition = definition[8:].strip()
-                    constants[current_constant.lower()][definition] = current_doc
-                    current_doc = []
-
-                # If there is -- without gap, then ignore
-                elif line_lowercase == '--':
-                    current_doc.append('')
 
-                # If there is word entity then try parse, save entity name and add description of entity to associative array
-                # ID of ass. array is name of entity. At the end clear current description and change state to entity declaration
-                elif line_lowercase.startswith('entity ') and ' is' in line_lowercase:
-                    parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
-                    current_entity = line.split()[1]
-                    entities[current_entity.lower()] = current_doc
+            # Line comments logic
+            elif line_lowercase.startswith('-- '):
+                # Logic for sampling names of groups of ports and generics
+                if (state == ParseState.PORT or state == ParseState.GENERIC) and '====' in line_lowercase:
+                    group_state = state
+                    state = ParseState.GROUPS
+                    current_group = ""
                     current_doc = []
-                    state = ParseState.ENTITY_DECL
-
-                # Check if there is any port declaration
-                elif state == ParseState.ENTITY_DECL and line_lowercase.startswith('port'):
-                    state = ParseState.PORT
+                elif state == ParseState.GROUPS and current_group != '' and '====' not in line_lowercase:
+                    current_doc.append(line[3:])
+                elif state == ParseState.GROUPS and '====' not in line_lowercase:
+                    current_group = current_entity_key + " " + line[3:].strip()
                     current_doc = []
-
-                # Check if there is any generic declaration
-                elif state == ParseState.ENTITY_DECL and line_lowercase.startswith('generic'):
-                    state = ParseState.GENERIC
+                elif state == ParseState.GROUPS and '====' in line_lowercase:
+                    group_definition = current_doc
+                    groups_desc[current_group] = group_definition
+                    state = group_state
                     current_doc = []
-
-                # If there is line which contains ":" then it's one of ports, parse it and save his definition
-                elif state == ParseState.PORT and ':' in line_lowercase:
-                    parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
-                    definition = line.split('--')[0].split(';')[0].split(':=')[0].strip()
-                    if definition.lower().startswith('signal'):
-                        definition = definition[6:].strip()
-                    if current_group == "":
-                        definition = definition
+                else:
+                    current_doc.append(line[3:])
+
+            # If line start with keyword architecture then save name of architecture
+            elif line_lowercase.startswith('architecture'):
+                state = ParseState.ARCH_DECL
+                current_constant = line.split()[3]
+                current_architecture_key = symbols.fold(f'{library}.{current_constant}')
+
+            # Instantiation of an entity or a component inside of an architecture body
+            elif instance_match is not None:
+                label = line.split(':')[0].strip()
+                if instance_match.group(2) is not None:
+                    unit = instance_match.group(2)
+                    if unit.startswith('work.'):
+                        unit = library + unit[4:]
+                    instances[current_architecture_key].append((label, symbols.fold(unit)))
+                elif instance_match.group(3) is not None:
+                    instances[current_architecture_key].append((label, symbols.fold(instance_match.group(3))))
+                elif instance_match.group(4) not in NON_INSTANCE_WORDS:
+                    if instance_match.group(5) is not None or instance_match.group(6) is not None:
+                        instances[current_architecture_key].append((label, symbols.fold(instance_match.group(4))))
                     else:
-                        definition = current_group + "}" + definition
-
-                    portsignals[current_entity.lower()][definition] = current_doc
+                        pending_instance = (label, symbols.fold(instance_match.group(4)))
+                current_doc = []
+
+            # If line contains keyword constant and state is not generice then start to collecting constants
+            elif state == ParseState.ARCH_DECL and 'constant' in line_lowercase:
+                parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
+                definition = line.split('--')[0].split(';')[0]
+                if ':=' not in definition:
+                    definition += ':= UNDEFINED'
+                definition = definition[8:].strip()
+                constants[current_architecture_key][definition] = current_doc
+                current_doc = []
+
+            # If there is -- without gap, then ignore
+            elif line_lowercase == '--':
+                current_doc.append('')
+
+            # If there is word entity then try parse, save entity name and add description of entity to associative array
+            # ID of ass. array is name of entity. At the end clear current description and change state to entity declaration
+            elif line_lowercase.startswith('entity ') and ' is' in line_lowercase:
+                parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
+                current_entity = line.split()[1]
+                current_entity_key = symbols.fold(f'{library}.{current_entity}')
+                entities[current_entity_key] = current_doc
+                current_doc = []
+                state = ParseState.ENTITY_DECL
+
+            # Check if there is any port declaration
+            elif state == ParseState.ENTITY_DECL and line_lowercase.startswith('port'):
+                state = ParseState.PORT
+                current_doc = []
+
+            # Check if there is any generic declaration
+            elif state == ParseState.ENTITY_DECL and line_lowercase.startswith('generic'):
+                state = ParseState.GENERIC
+                current_doc = []
+
+            # If there is line which contains ":" then it's one of generics or ports, parse it and save his definition
+            # A declaration with unbalanced parentheses continues on the next lines
+            elif state in (ParseState.PORT, ParseState.GENERIC) and ':' in line_lowercase:
+                parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
+                code = line.split('--')[0]
+                if code.count('(') > code.count(')') and ';' not in code:
+                    pending_declaration = [code.strip()]
+                    pending_depth = code.count('(') - code.count(')')
+                else:
+                    store_declaration(state, code, current_group, current_entity_key, current_doc)
                     current_doc = []
 
-                # If there is line which contains ":" then it's one of generic, parse it and save his definition
-                elif state == ParseState.GENERIC and ':' in line_lowercase:
+            # End of the entity was found
+            elif state == ParseState.ENTITY_DECL and line_lowercase.startswith('end'):
+                state = None
+                group_state = None
+                current_doc = []
+
+            # Instantiation of a generic package has no body of its own and no end
+            elif (state is None or state is ParseState.PACKAGE) and PACKAGE_INSTANCE_RE.match(line_lowercase):
+                current_doc = []
+
+            # If there is magic word package then parse package and save his definition
+            elif (state is None or state is ParseState.PACKAGE) and line_lowercase.startswith('package'):
+                parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
+                state = ParseState.PACKAGE
+                current_package = ('' if current_package == '' else (current_package + '.')) + line.split()[1]
+                is_body = line_lowercase.split()[1] == 'body' and len(line_lowercase.split()) > 2
+                package_ends.append((line_lowercase.split()[2 if is_body else 1], is_body))
+                current_scope = symbols.fold(f'{library}.{current_package}')
+                packages[current_scope] = current_doc
+                current_doc = []
+
+            # Signalization of end of the package
+            elif state is ParseState.PACKAGE and (line_lowercase.startswith('end package') or
+                                                  is_package_end(line_lowercase, *(package_ends[-1] if package_ends else ('', False)))):
+                if package_ends:
+                    package_ends.pop()
+                current_package = '.'.join(current_package.split('.')[:-1])
+                current_scope = library if current_package == '' else symbols.fold(f'{library}.{current_package}')
+                state = None if current_package == '' else ParseState.PACKAGE
+                current_doc = []
+
+            # Package contains type, parse it
+            elif (state is None or state is ParseState.PACKAGE) and line_lowercase.startswith('type'):
+                if ' record' in line.split('--')[0].lower().split(maxsplit=2)[-1]:
                     parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
-                    definition = line.split('--')[0].split(';')[0].strip()
-                    if ':=' not in definition:
-                        definition += ':= UNDEFINED'
-                    if definition.lower().startswith('constant'):
-                        definition = definition[8:].strip()
-                    if current_group == "":
-                        definition = definition
-                    else:
-                        definition = current_group + "}" + definition
-
-                    generics[current_entity.lower()][definition] = current_doc
+                    current_type_name = symbols.fold(f'{current_scope}.{line.split()[1]}')
+                    records[current_type_name] = current_doc
                     current_doc = []
-
-                # End of the entity was found
-                elif state == ParseState.ENTITY_DECL and line_lowercase.startswith('end'):
-                    state = None
-                    group_state = None
+                    state = ParseState.RECORD
+                elif ' '.join(line.split()[2:])[2:].strip().startswith('('):
+                    parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
+                    current_type_name = symbols.fold(f'{current_scope}.{line.split()[1]}')
+                    enums[current_type_name] = current_doc
                     current_doc = []
-
-                # If there is magic word package then parse package and save his definition
-                elif (state is None or state is ParseState.PACKAGE) and line_lowercase.startswith('package'):
+                    state = ParseState.ENUM
+                else:
                     parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
-                    state = ParseState.PACKAGE
-                    current_package = ('' if current_package == '' else (current_package + '.')) + line.split()[1]
-                    packages[current_package.lower()] = current_doc
+                    types[symbols.fold(f'{current_scope}.{line.split()[1]}')] = ' '.join(line.split()[3:]), current_doc
                     current_doc = []
 
-                # Signalization of end of the package
-                elif state is ParseState.PACKAGE and line_lowercase.startswith('end package'):
-                    current_package = '.'.join(current_package.split('.')[:-1])
-                    state = None if current_package == '' else ParseState.PACKAGE
+            # Signalization of the end of record
+            elif state is ParseState.RECORD and line_lowercase.startswith('end record'):
+                if current_package != '':
+                    state = ParseState.PACKAGE
+                else:
+                    state = None
+                current_doc = []
+
+            # Signalization of the start of record
+            elif state is ParseState.RECORD and ':' in line:
+                parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
+                element_name, element_type = tuple([x.strip() for x in line.split(';')[0].split(':', 1)])
+                record_elements[current_type_name][f'{element_name} : {element_type}'] = current_doc
+                current_doc = []
+
+            # Enumarate parsing
+            elif state is ParseState.ENUM:
+                if not line_lowercase.startswith(')'):
+                    parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
+                    enumvals[current_type_name][line.split(',')[0]] = current_doc
                     current_doc = []
 
-                # Package contains type, parse it
-                elif (state is None or state is ParseState.PACKAGE) and line_lowercase.startswith('type'):
-                    if ' record' in line.split('--')[0].lower().split(maxsplit=2)[-1]:
-                        parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
-                        records[line.split()[1]] = current_doc
-                        current_doc = []
-                        state = ParseState.RECORD
-                        current_type_name = line.split()[1]
-                    elif ' '.join(line.split()[2:])[2:].strip().startswith('('):
-                        parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
-                        enums[line.split()[1]] = current_doc
-                        current_doc = []
-                        state = ParseState.ENUM
-                        current_type_name = line.split()[1]
-                    else:
-                        parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
-                        types[line.split()[1]] = ' '.join(line.split()[3:]), current_doc
-                        current_doc = []
+            # Function parsing
+            elif line_lowercase.startswith('function') and line.split('--')[0].strip().endswith(';'):
+                parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
+                return_type = '' if 'return' not in line else line.split('return')[1].strip()[:-1]
+                function_name = line.split()[1].split('(')[0]
+                functions[symbols.fold(f'{current_scope}.{function_name}')] = return_type, current_doc
+                current_doc = []
+
+            # Ignore others
+            else:
+                current_doc = []
+
+            # Connection between ports, generics and entity
+            if state in (ParseState.PORT, ParseState.GENERIC):
+                open_parentheses += line.split('--')[0].count('(')
+                open_parentheses -= line.split('--')[0].count(')')
+                if open_parentheses == 0:
+                    state = ParseState.ENTITY_DECL
+                    pending_declaration = None
 
-                # Signalization of the end of record
-                elif state is ParseState.RECORD and line_lowercase.startswith('end record'):
+            # Connection between Enumerate and current package
+            if state == ParseState.ENUM:
+                open_parentheses += line.split('--')[0].count('(')
+                open_parentheses -= line.split('--')[0].count(')')
+                if open_parentheses == 0:
                     if current_package != '':
                         state = ParseState.PACKAGE
                     else:
                         state = None
-                    current_doc = []
-
-                # Signalization of the start of record
-                elif state is ParseState.RECORD and ':' in line:
-                    parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
-                    element_name, element_type = tuple([x.strip() for x in line.split(';')[0].split(':', 1)])
-                    record_elements[current_type_name][f'{element_name} : {element_type}'] = current_doc
-                    current_doc = []
-
-                # Enumarate parsing
-                elif state is ParseState.ENUM:
-                    if not line_lowercase.startswith(')'):
-                        parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
-                        enumvals[current_type_name][line.split(',')[0]] = current_doc
-                        current_doc = []
-
-                # Function parsing
-                elif line_lowercase.startswith('function') and line.split('--')[0].strip().endswith(';'):
-                    parse_inline_doc_or_print_error(current_doc, filename, line, lineno)
-                    return_type = '' if 'return' not in line else (line.split('return')[1].strip()[:-1] + '.')
-                    functions[return_type + line_lowercase.split()[1]] = current_doc
-                    current_doc = []
-
-                # Ignore others
-                else:
-                    current_doc = []
-
-                # Connection between ports, generics and entity
-                if state in (ParseState.PORT, ParseState.GENERIC):
-                    open_parentheses += line.split('--')[0].count('(')
-                    open_parentheses -= line.split('--')[0].count(')')
-                    if open_parentheses == 0:
-                        state = ParseState.ENTITY_DECL
-
-                # Connection between Enumerate and current package
-                if state == ParseState.ENUM:
-                    open_parentheses += line.split('--')[0].count('(')
-                    open_parentheses -= line.split('--')[0].count(')')
-                    if open_parentheses == 0:
-                        if current_package != '':
-                            state = ParseState.PACKAGE
-                        else:
-                            state = None
 
+        # A line which cannot be parsed discards the rest of its design unit
+        except Exception as e:
+            report(filename, lineno, current_unit, f"Cannot parse the line ({type(e).__name__}: {e}); "
+                                                   f"skipping to the next design unit. Offending line: {line}")
+            skipping = True
+            state = None
+            group_state = None
+            open_parentheses = 0
+            pending_declaration = None
+            current_doc = []
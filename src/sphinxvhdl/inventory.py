@@ -0,0 +1,108 @@
+# inventory.py: Loading of VHDL objects from external Sphinx inventories
+# Copyright (C) 2021 CESNET z.s.p.o.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import io
+import os
+import posixpath
+import urllib.request
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sphinx.util import logging
+from sphinx.util.inventory import InventoryFile
+
+logger = logging.getLogger(__name__)
+
+# Object types written to objects.inv by the VHDL domain, mapped to the keys of its 'refs' data
+INVENTORY_TYPES = {
+    'type': 'types',
+    'entity': 'entity',
+    'portsignal': 'portsignal',
+    'gengeneric': 'gengeneric',
+    'genconstant': 'genconstant',
+    'parameters': 'parameters',
+}
+
+# Inventories already loaded in this process, keyed by their location
+_loaded = {}
+
+
+class ExternalInventory:
+    """
+    VHDL objects of one external project, indexed the same way as the ``refs`` data of the VHDL domain:
+    ``refs[kind][simple_name]`` is a list of ``(qualified_name, (uri, display_name))``
+    """
+
+    def __init__(self, name: str, project: str = '', version: str = ''):
+        self.name = name
+        self.project = project
+        self.version = version
+        self.refs: Dict[str, Dict[str, List[Tuple[str, Tuple[str, str]]]]] = {
+            kind: defaultdict(list) for kind in INVENTORY_TYPES.values()
+        }
+
+
+def parse_inventory(name: str, data: bytes, uri: str) -> ExternalInventory:
+    """
+    Parses a Sphinx inventory and keeps only the objects of the VHDL domain
+    :param name: name of the inventory used in messages
+    :param data: raw content of the objects.inv file
+    :param uri: base URI which the locations in the inventory are relative to
+    :return: the loaded inventory
+    """
+    data = InventoryFile.load(io.BytesIO(data), uri, posixpath.join)
+    inventory = ExternalInventory(name)
+    for objtype, items in data.items():
+        if not objtype.startswith('vhdl:') or objtype[5:] not in INVENTORY_TYPES:
+            continue
+        for fullname, item in items.items():
+            # Sphinx 8.2+ items have attributes, the older ones are plain tuples
+            if hasattr(item, 'uri'):
+                project, version, location, dispname = item.project_name, item.project_version, item.uri, item.display_name
+            else:
+                project, version, location, dispname = item
+            inventory.project, inventory.version = project, version
+            if dispname == '-':
+                dispname = fullname
+            fullname = fullname.lower()
+            inventory.refs[INVENTORY_TYPES[objtype[5:]]][fullname.split('.')[-1]].append((fullname, (location, dispname)))
+    return inventory
+
+
+def load_inventory(name: str, uri: str, location: Optional[str], confdir: str,
+                   timeout: Optional[float] = None) -> Optional[ExternalInventory]:
+    """
+    Loads an inventory of an external project, either from a local file or from an URL
+    :param name: name of the inventory from the configuration
+    :param uri: base URI of the external documentation
+    :param location: path or URL of the objects.inv file, None to use the one at the base URI
+    :param confdir: directory which relative paths are resolved against
+    :param timeout: timeout of fetching the inventory from an URL in seconds, None to wait indefinitely
+    :return: the loaded inventory or None if it could not be loaded
+    """
+    if location is None:
+        location = posixpath.join(uri, 'objects.inv')
+    is_url = '://' in location
+    if not is_url:
+        location = os.path.join(confdir, location)
+    if location in _loaded:
+        return _loaded[location]
+
+    try:
+        if is_url:
+            with urllib.request.urlopen(location, timeout=timeout) as stream:
+                data = stream.read()
+        else:
+            with open(location, 'rb') as stream:
+                data = stream.read()
+        inventory = parse_inventory(name, data, uri)
+    except Exception as e:
+        logger.warning(f"SPHINX-VHDL: Failed to load VHDL inventory {name} from {location}: {e}")
+        inventory = None
+    else:
+        logger.info(f"SPHINX-VHDL: Loaded VHDL inventory {name} from {location}.")
+
+    _loaded[location] = inventory
+    return inventory
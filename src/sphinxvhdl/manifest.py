@@ -0,0 +1,143 @@
+# manifest.py: Reading of VHDL source lists of build systems
+# Copyright (C) 2021 CESNET z.s.p.o.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import re
+from typing import List, Optional, Set, Tuple
+
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+VHDL_SUFFIXES = ('.vhd', '.vhdl')
+
+# Words of a Tcl line; quoted strings, braced strings and bare words
+TCL_WORD_RE = re.compile(r'"([^"]*)"|\{([^{}]*)\}|([^\s\[\]{}"]+)')
+
+
+class Manifest:
+    """
+    VHDL sources listed by a manifest and its included manifests, in compile order
+    """
+
+    def __init__(self):
+        self.sources: List[Tuple[str, Optional[str]]] = []  # (path, library or None for the default one)
+        self.contents: List[bytes] = []  # raw content of each read manifest, for hashing
+        self.read: Set[str] = set()  # real paths of the read manifests, each one is read only once
+
+    def add_source(self, path: str, library: Optional[str]) -> None:
+        self.sources.append((os.path.normpath(path), library))
+
+
+def is_manifest(path: str) -> bool:
+    """
+    :param path: entry of ``vhdl_autodoc_source_path``
+    :return: True if the entry is a manifest file rather than a directory with the sources
+    """
+    return os.path.isfile(path)
+
+
+def read_manifest(path: str, manifest: Optional[Manifest] = None, library: Optional[str] = None) -> Manifest:
+    """
+    Reads a list of VHDL sources in the compile order. ``*.tcl`` files are read as ``Modules.tcl`` files,
+    any other files as plain file lists (``*.f``).
+    :param path: path of the manifest
+    :param manifest: manifest the sources are appended to, a new one is created if None
+    :param library: library of the listed sources unless the manifest specifies one
+    :return: the manifest with the listed sources
+    """
+    if manifest is None:
+        manifest = Manifest()
+    if os.path.realpath(path) in manifest.read:
+        return manifest
+    manifest.read.add(os.path.realpath(path))
+    try:
+        with open(path, 'rb') as manifest_file:
+            content = manifest_file.read()
+    except OSError as e:
+        logger.warning(f"SPHINX-VHDL: Cannot read VHDL manifest {path}: {e}")
+        return manifest
+    manifest.contents.append(content)
+
+    if path.endswith('.tcl'):
+        read_modules_tcl(path, content.decode(errors='replace'), manifest, library)
+    else:
+        read_file_list(path, content.decode(errors='replace'), manifest, library)
+    return manifest
+
+
+def read_file_list(path: str, content: str, manifest: Manifest, library: Optional[str]) -> None:
+    """
+    Reads a plain file list. Each line contains a path relative to the list, ``#`` and ``//`` start comments.
+    ``-work <library>`` (or ``--work=<library>``) selects the library of the following sources, ``-f <list>``
+    (or ``-F <list>``) includes another list. Environment variables in the paths are expanded; entries which
+    are not VHDL sources, e.g. Verilog sources or tool options, are skipped.
+    """
+    base = os.path.dirname(path)
+    words = []
+    for line in content.splitlines():
+        words += re.split(r'#|//', line, 1)[0].split()
+
+    index = 0
+    while index < len(words):
+        word = words[index]
+        if word in ('-work', '--work') and index + 1 < len(words):
+            library = words[index + 1].lower()
+            index += 1
+        elif word.startswith('--work='):
+            library = word.split('=', 1)[1].lower()
+        elif word in ('-f', '-F') and index + 1 < len(words):
+            read_manifest(os.path.join(base, os.path.expandvars(words[index + 1])), manifest, library)
+            index += 1
+        elif word.lower().endswith(VHDL_SUFFIXES):
+            manifest.add_source(os.path.join(base, os.path.expandvars(word)), library)
+        index += 1
+
+
+def read_modules_tcl(path: str, content: str, manifest: Manifest, library: Optional[str]) -> None:
+    """
+    Reads a ``Modules.tcl`` file as used by the NDK build system, without evaluating it as a Tcl script.
+    Sources are taken from ``lappend MOD ...`` and ``set MOD "$MOD ..."`` commands, optionally with
+    ``LIBRARY <library>`` in the list of a source. Directories in ``lappend COMPONENTS`` and
+    ``set COMPONENTS`` commands are read from their own ``Modules.tcl`` files first, as they are compiled
+    before the modules. ``$ENTITY_BASE`` is the directory of the file, other variables are taken from
+    the environment.
+    """
+    base = os.path.dirname(path)
+    variables = {'ENTITY_BASE': os.path.abspath(base)}
+
+    def substitute(word: str) -> str:
+        return re.sub(r'\$\{?(\w+)\}?', lambda x: variables.get(x.group(1), os.environ.get(x.group(1), x.group(0))), word)
+
+    modules: List[Tuple[str, Optional[str]]] = []
+    for line in content.splitlines():
+        line = line.strip()
+        if line.startswith('#'):
+            continue
+        words = [substitute(next(x for x in match if x)) for match in TCL_WORD_RE.findall(line) if any(match)]
+        if len(words) < 3 or words[0] not in ('set', 'lappend'):
+            continue
+
+        if words[1] == 'MOD':
+            source_library = library
+            paths = []
+            for index, word in enumerate(words[2:], 2):
+                if words[index - 1] == 'LIBRARY':
+                    source_library = word.lower()
+                elif word.lower().endswith(VHDL_SUFFIXES):
+                    paths += [x for x in word.split() if x.lower().endswith(VHDL_SUFFIXES)]
+            modules += [(os.path.join(base, x), source_library) for x in paths]
+
+        elif words[1] == 'COMPONENTS':
+            for word in words[2:]:
+                component = os.path.join(base, word, 'Modules.tcl')
+                if '$' not in word and os.path.isfile(component):
+                    read_manifest(component, manifest, library)
+
+    for source, source_library in modules:
+        if '$' in source:
+            logger.warning(f"SPHINX-VHDL: Unresolved variable in VHDL source {source} listed in {path}")
+        else:
+            manifest.add_source(source, source_library)
@@ -0,0 +1,171 @@
+# service.py: Shared service parsing the VHDL sources for several documentation builds
+# Copyright (C) 2021 CESNET z.s.p.o.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""
+A local service which parses the VHDL sources on behalf of the documentation builds, so that the builds of
+several projects documenting the same sources do not parse them again each. It is started with::
+
+    python -m sphinxvhdl.service /run/sphinx-vhdl.sock
+
+and used by the builds with the ``vhdl_autodoc_service`` configuration value set to the path of the socket.
+
+A build sends one JSON line ``{"version": 1, "sources": [["<path>", "<library>"], ...]}`` with the sources it
+would parse and receives one JSON line ``{"version": 1, "stores": [<dump>, ...]}`` with the objects parsed from
+each of them, see :py:func:`.autodoc.dump_stores`. A build and a service of different protocol versions do not
+exchange any objects, the build parses the sources itself. The service keeps the objects of every parsed source and parses a source again
+only when its modification time or size changes, so each change of the sources is parsed once for all
+the builds.
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sphinx.util import logging
+
+from . import autodoc
+from .symbols import IdentifierTable
+
+logger = logging.getLogger(__name__)
+
+# Seconds a build waits for the service, parsing a large tree for the first time may take a while
+TIMEOUT = 600
+# Version of the requests and responses, changed along with the format of the dumps
+PROTOCOL_VERSION = 1
+
+
+class ParseCache:
+    """
+    Objects parsed from each source, see :py:func:`.autodoc.dump_stores`, along with the state of the file
+    they were parsed from
+    """
+
+    def __init__(self):
+        self.symbols = IdentifierTable()
+        self.dumps: Dict[Tuple[str, str], Tuple[Tuple[int, int], dict]] = {}
+        # The parser keeps its results in module globals, so only one source is parsed at a time
+        self.lock = threading.Lock()
+
+    def get(self, filename: str, library: str) -> dict:
+        """
+        :param filename: absolute path of the source
+        :param library: case-folded name of the library the source is compiled into
+        :return: the objects parsed from the source, it is parsed again if it has changed
+        """
+        try:
+            stat = os.stat(filename)
+            state = stat.st_mtime_ns, stat.st_size
+        except OSError:
+            state = 0, -1
+        with self.lock:
+            cached = self.dumps.get((filename, library))
+            if cached is not None and cached[0] == state:
+                return cached[1]
+            autodoc.clear_stores()
+            autodoc.parse_source(filename, library, self.symbols)
+            dump = autodoc.dump_stores()
+            self.dumps[(filename, library)] = state, dump
+            return dump
+
+
+class ParseRequestHandler(socketserver.StreamRequestHandler):
+    server: 'ParseServer'
+
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+            if request.get('version') != PROTOCOL_VERSION:
+                raise ValueError(f'unsupported protocol version {request.get("version")}')
+            dumps = [self.server.cache.get(filename, library) for filename, library in request['sources']]
+            response = {'version': PROTOCOL_VERSION, 'stores': dumps}
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            response = {'version': PROTOCOL_VERSION, 'error': f'invalid request: {e}'}
+        self.wfile.write(json.dumps(response, separators=(',', ':')).encode())
+        self.wfile.write(b'\n')
+
+
+class ParseServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str):
+        self.cache = ParseCache()
+        super().__init__(path, ParseRequestHandler)
+
+
+def fetch(path: str, sources: List[Tuple[str, str]], symbols: IdentifierTable) -> bool:
+    """
+    Loads the objects parsed from the sources by the service into :py:mod:`.autodoc`
+    :param path: path of the socket of the service
+    :param sources: pairs of a source path and its library, see :py:func:`.autodoc.collect_sources`
+    :param symbols: identifier table of the build
+    :return: True if the objects were loaded, False if the service is not available
+    """
+    request = {'version': PROTOCOL_VERSION, 'sources': [(os.path.abspath(filename), library) for filename, library in sources]}
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(TIMEOUT)
+            client.connect(path)
+            client.sendall(json.dumps(request, separators=(',', ':')).encode() + b'\n')
+            with client.makefile('rb') as stream:
+                response = json.loads(stream.readline())
+    except (OSError, ValueError) as e:
+        logger.info(f"SPHINX-VHDL: VHDL parse service at {path} is not available ({e}), parsing the sources locally.")
+        return False
+    if not isinstance(response, dict) or response.get('version') != PROTOCOL_VERSION:
+        logger.warning(f"SPHINX-VHDL: VHDL parse service at {path} uses another protocol version, "
+                       "parsing the sources locally.")
+        return False
+    if 'error' in response:
+        logger.warning(f"SPHINX-VHDL: VHDL parse service at {path} failed: {response['error']}")
+        return False
+
+    try:
+        autodoc.load_stores(response['stores'], symbols)
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        # The objects loaded before the error are dropped, the sources are parsed from scratch
+        autodoc.clear_stores()
+        logger.warning(f"SPHINX-VHDL: Invalid response of VHDL parse service at {path} ({e}), parsing the sources locally.")
+        return False
+    # The problems were reported by the service, they are reported in the build again
+    for diagnostic in autodoc.diagnostics:
+        logger.warning(f"SPHINX-VHDL: {diagnostic.message}", location=f"{diagnostic.filename}:{diagnostic.lineno}")
+    autodoc.report_summary()
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m sphinxvhdl.service',
+                                     description='Parses VHDL sources for documentation builds.')
+    parser.add_argument('socket', help='path of the Unix socket to listen on')
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.socket):
+        # A socket left by a service which was killed is replaced, a running service is kept
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            try:
+                client.connect(args.socket)
+            except OSError:
+                os.remove(args.socket)
+            else:
+                print(f'error: a service is already listening on {args.socket}', file=sys.stderr)
+                return 1
+    with ParseServer(args.socket) as server:
+        print(f'Listening on {args.socket}.', file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(args.socket)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
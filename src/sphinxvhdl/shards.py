@@ -0,0 +1,154 @@
+# shards.py: Mergeable VHDL symbol shards of partial documentation builds
+# Copyright (C) 2021 CESNET z.s.p.o.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""
+A shard holds the targets of VHDL references defined by the documents of one partial build. It is a JSON
+file of the form::
+
+    {
+        "format": "sphinx-vhdl-shard",
+        "version": 1,
+        "refs": {"<kind>": [["<simple name>", "<qualified name>", "<docname>", "<anchor>"], ...], ...}
+    }
+
+All the lists are sorted and without duplicates, so the shards of the same input are byte-identical and
+merging shards is a union of their lists. Shards are merged with::
+
+    python -m sphinxvhdl.shards -o merged.json shard1.json shard2.json ...
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sphinx.util import logging
+
+from .inventory import INVENTORY_TYPES
+
+logger = logging.getLogger(__name__)
+
+SHARD_FORMAT = 'sphinx-vhdl-shard'
+SHARD_VERSION = 1
+
+# Shards already loaded in this process, keyed by the list of their paths
+_loaded = {}
+
+
+def dump_shard(domain) -> dict:
+    """
+    :param domain: the VHDL domain of a (partial) build
+    :return: shard with the targets of all the documents of the build
+    """
+    symbols = domain.symbols
+    refs = {}
+    for kind in INVENTORY_TYPES.values():
+        refs[kind] = sorted({
+            (symbols.name(name_id), symbols.name(qualified_id), docname, anchor)
+            for name_id, targets in domain.data['refs'][kind].items()
+            for qualified_id, (docname, anchor) in targets
+        })
+    return {
+        'format': SHARD_FORMAT,
+        'version': SHARD_VERSION,
+        'refs': refs,
+    }
+
+
+def merge_shards(shards: Iterable[dict]) -> dict:
+    """
+    :param shards: shards of partial builds
+    :return: a shard with the union of their targets
+    """
+    refs = {kind: set() for kind in INVENTORY_TYPES.values()}
+    for shard in shards:
+        for kind, targets in shard['refs'].items():
+            refs.setdefault(kind, set()).update(tuple(x) for x in targets)
+    return {
+        'format': SHARD_FORMAT,
+        'version': SHARD_VERSION,
+        'refs': {kind: sorted(targets) for kind, targets in refs.items()},
+    }
+
+
+def write_shard(path: str, shard: dict) -> None:
+    with open(path, 'w', encoding='utf-8') as shard_file:
+        json.dump(shard, shard_file, separators=(',', ':'), sort_keys=True)
+        shard_file.write('\n')
+
+
+def read_shard(path: str) -> dict:
+    """
+    :param path: path of a shard file
+    :return: the shard
+    :raises ValueError: if the file is not a shard of a supported version
+    """
+    with open(path, encoding='utf-8') as shard_file:
+        shard = json.load(shard_file)
+    if not isinstance(shard, dict) or shard.get('format') != SHARD_FORMAT:
+        raise ValueError(f'{path} is not a VHDL shard')
+    if shard.get('version') != SHARD_VERSION:
+        raise ValueError(f'{path} is a VHDL shard of unsupported version {shard.get("version")}')
+    return shard
+
+
+class ShardIndex:
+    """
+    Targets of the other shards of the build, indexed the same way as the ``refs`` data of the VHDL domain:
+    ``refs[kind][simple_name]`` is a list of ``(qualified_name, (docname, anchor))``
+    """
+
+    def __init__(self, shards: Iterable[dict], own_docs: Iterable[str]):
+        own_docs = set(own_docs)
+        self.refs: Dict[str, Dict[str, List[Tuple[str, Tuple[str, str]]]]] = {
+            kind: defaultdict(list) for kind in INVENTORY_TYPES.values()
+        }
+        for shard in shards:
+            for kind, targets in shard['refs'].items():
+                for name, qualified_name, docname, anchor in targets:
+                    if docname not in own_docs:
+                        self.refs[kind][name].append((qualified_name, (docname, anchor)))
+
+
+def load_shards(paths: List[str], own_docs: Iterable[str]) -> Optional[ShardIndex]:
+    """
+    Loads the shards of the other partial builds, the targets in the documents of this build are skipped
+    :param paths: paths of the shards
+    :param own_docs: documents of this build
+    :return: index of the targets or None if there are no shards
+    """
+    if not paths:
+        return None
+    key = tuple(paths)
+    if key not in _loaded:
+        shards = []
+        for path in paths:
+            try:
+                shards.append(read_shard(path))
+            except (OSError, ValueError) as e:
+                logger.warning(f"SPHINX-VHDL: Failed to load VHDL shard {path}: {e}")
+        _loaded[key] = ShardIndex(shards, own_docs)
+    return _loaded[key]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m sphinxvhdl.shards',
+                                     description='Merges VHDL symbol shards of partial documentation builds.')
+    parser.add_argument('-o', '--output', required=True, help='path of the merged shard')
+    parser.add_argument('shards', nargs='+', help='paths of the shards to merge')
+    args = parser.parse_args(argv)
+
+    try:
+        shards = [read_shard(x) for x in args.shards]
+    except (OSError, ValueError) as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 1
+    write_shard(args.output, merge_shards(shards))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,247 @@
+# symbols.py: Case-folded VHDL identifiers shared by the parser and the domain
+# Copyright (C) 2021 CESNET z.s.p.o.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import sys
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+
+class IdentifierTable:
+    """
+    Case-folds and interns VHDL identifiers and hands out compact integer ids for them.
+
+    VHDL identifiers are case-insensitive, so every identifier is folded to lowercase once and all
+    the folded identifiers with the same text share one string object.
+    """
+
+    def __init__(self):
+        self._folded: Dict[str, str] = {}
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+
+    def fold(self, identifier: str) -> str:
+        """
+        :param identifier: identifier as written in the source or documentation
+        :return: the interned, case-folded identifier
+        """
+        folded = self._folded.get(identifier)
+        if folded is None:
+            folded = sys.intern(identifier.lower())
+            self._folded[identifier] = folded
+        return folded
+
+    def intern(self, identifier: str) -> int:
+        """
+        :param identifier: identifier as written in the source or documentation
+        :return: the id of the case-folded identifier, a new one is assigned if it is not known yet
+        """
+        folded = self.fold(identifier)
+        symbol_id = self._ids.get(folded)
+        if symbol_id is None:
+            symbol_id = len(self._names)
+            self._ids[folded] = symbol_id
+            self._names.append(folded)
+        return symbol_id
+
+    def lookup(self, identifier: str) -> Optional[int]:
+        """
+        :param identifier: identifier as written in the source or documentation
+        :return: the id of the case-folded identifier or None if it is not known
+        """
+        return self._ids.get(self.fold(identifier))
+
+    def name(self, symbol_id: int) -> str:
+        """
+        :param symbol_id: id returned by :py:meth:`intern`
+        :return: the case-folded identifier
+        """
+        return self._names[symbol_id]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, identifier: str) -> bool:
+        return self.fold(identifier) in self._ids
+
+    def __getstate__(self):
+        return '\n'.join(self._names)
+
+    def __setstate__(self, state):
+        self._names = [sys.intern(x) for x in state.split('\n')] if state else []
+        self._ids = {x: i for i, x in enumerate(self._names)}
+        self._folded = {x: x for x in self._names}
+
+
+class SymbolRefs:
+    """
+    Targets of references of one kind, indexed by the id of the simple name they are referenced by.
+
+    Each target is a pair ``(qualified_id, (docname, anchor))``. For pickling, the targets are stored
+    as compressed columns of integer arrays sorted by the simple name, plus one string table shared by
+    the document names and anchors, instead of a large number of small tuples. Anchors are stored as
+    a prefix shared by the targets of the same kind, the rest of the anchor is rebuilt from the names.
+
+    After unpickling, the columns are kept as they are and only the rows of the looked up name are
+    decoded. Targets added later are kept in a dictionary beside the columns, targets of removed
+    documents are hidden in the columns and removed from the dictionary.
+    """
+
+    # How an anchor is rebuilt from its stored prefix
+    ANCHOR_VERBATIM = 0  # the prefix is the whole anchor
+    ANCHOR_QUALIFIED = 1  # prefix + qualified name
+    ANCHOR_MEMBER = 2  # prefix + qualified name + '-' + simple name
+
+    def __init__(self, symbols: IdentifierTable):
+        self.symbols = symbols
+        self._columns: Optional[Tuple[array, array, array, array, array]] = None
+        self._strings: List[str] = []
+        self._string_ids: Optional[Dict[str, int]] = None
+        self._removed: Set[int] = set()  # indices of the document names removed from the columns
+        self._targets: Dict[int, List[Tuple[int, Tuple[str, str]]]] = defaultdict(list)
+        self._docs: Dict[str, Set[int]] = defaultdict(set)  # ids of the names with targets in each document
+
+    def add(self, name_id: int, qualified_id: int, docname: str, anchor: str) -> None:
+        self._targets[name_id].append((qualified_id, (docname, anchor)))
+        self._docs[docname].add(name_id)
+
+    def _column_targets(self, start: int, end: int) -> List[Tuple[int, Tuple[str, str]]]:
+        _, qualified_ids, doc_indices, anchor_indices, anchor_modes = self._columns
+        names = self.symbols.name
+        targets = []
+        for row in range(start, end):
+            if doc_indices[row] in self._removed:
+                continue
+            anchor = self._strings[anchor_indices[row]]
+            qualified_id = qualified_ids[row]
+            if anchor_modes[row] == self.ANCHOR_MEMBER:
+                anchor = f'{anchor}{names(qualified_id)}-{names(self._columns[0][row])}'
+            elif anchor_modes[row] == self.ANCHOR_QUALIFIED:
+                anchor += names(qualified_id)
+            targets.append((qualified_id, (self._strings[doc_indices[row]], anchor)))
+        return targets
+
+    def __getitem__(self, name_id: int) -> List[Tuple[int, Tuple[str, str]]]:
+        targets = []
+        if self._columns is not None:
+            name_ids = self._columns[0]
+            start = bisect_left(name_ids, name_id)
+            targets = self._column_targets(start, bisect_right(name_ids, name_id, start))
+        return targets + self._targets.get(name_id, [])
+
+    def __contains__(self, name_id: Optional[int]) -> bool:
+        return name_id is not None and len(self[name_id]) > 0
+
+    def items(self) -> Iterator[Tuple[int, List[Tuple[int, Tuple[str, str]]]]]:
+        name_ids = set(self._targets)
+        if self._columns is not None:
+            name_ids.update(self._columns[0])
+        for name_id in sorted(name_ids):
+            targets = self[name_id]
+            if targets:
+                yield name_id, targets
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.items())
+
+    def remove_doc(self, docname: str) -> None:
+        """
+        Removes all the targets in a document
+        """
+        if self._columns is not None:
+            if self._string_ids is None:
+                self._string_ids = {x: i for i, x in enumerate(self._strings)}
+            if docname in self._string_ids:
+                self._removed.add(self._string_ids[docname])
+        for name_id in self._docs.pop(docname, ()):
+            targets = [x for x in self._targets[name_id] if x[1][0] != docname]
+            if targets:
+                self._targets[name_id] = targets
+            else:
+                del self._targets[name_id]
+
+    def __getstate__(self):
+        name_ids = array('I')
+        qualified_ids = array('I')
+        doc_indices = array('I')
+        anchor_indices = array('I')
+        anchor_modes = array('B')
+        strings: Dict[str, int] = {}
+        for name_id, targets in self.items():
+            name = self.symbols.name(name_id)
+            for qualified_id, (docname, anchor) in targets:
+                qualified_name = self.symbols.name(qualified_id)
+                if anchor.endswith(f'{qualified_name}-{name}'):
+                    mode = self.ANCHOR_MEMBER
+                    anchor = anchor[:-len(qualified_name) - len(name) - 1]
+                elif anchor.endswith(qualified_name):
+                    mode = self.ANCHOR_QUALIFIED
+                    anchor = anchor[:-len(qualified_name)]
+                else:
+                    mode = self.ANCHOR_VERBATIM
+                name_ids.append(name_id)
+                qualified_ids.append(qualified_id)
+                doc_indices.append(strings.setdefault(docname, len(strings)))
+                anchor_indices.append(strings.setdefault(anchor, len(strings)))
+                anchor_modes.append(mode)
+        columns = tuple(zlib.compress(column.tobytes(), 1)
+                        for column in (name_ids, qualified_ids, doc_indices, anchor_indices, anchor_modes))
+        return self.symbols, columns + ('\n'.join(strings),)
+
+    def __setstate__(self, state):
+        self.symbols, (*compressed_columns, strings) = state
+        columns = []
+        for column, typecode in zip(compressed_columns, 'IIIIB'):
+            columns.append(array(typecode))
+            columns[-1].frombytes(zlib.decompress(column))
+        self._columns = tuple(columns) if columns[0] else None
+        self._strings = strings.split('\n')
+        self._string_ids = None
+        self._removed = set()
+        self._targets = defaultdict(list)
+        self._docs = defaultdict(set)
+
+
+class SymbolStore(defaultdict):
+    """
+    Objects parsed from the VHDL sources, keyed by their case-folded qualified names
+    (``library.name`` or ``library.package.name``).
+
+    Besides the exact lookups of the qualified names, the objects can be looked up by any trailing part
+    of their qualified name, e.g. ``package.name`` or just ``name``, through an index of simple names.
+    """
+
+    def __init__(self, default_factory=None):
+        super().__init__(default_factory)
+        self.by_name: Dict[str, List[str]] = defaultdict(list)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key not in self:
+            self.by_name[key.rsplit('.', 1)[-1]].append(key)
+        super().__setitem__(key, value)
+
+    def clear(self) -> None:
+        super().clear()
+        self.by_name.clear()
+
+    def candidates(self, name: str) -> List[str]:
+        """
+        :param name: case-folded name, either qualified, partially qualified or simple
+        :return: sorted qualified names of all the objects matching the name
+        """
+        if name in self:
+            return [name]
+        suffix = '.' + name
+        return sorted(x for x in self.by_name.get(name.rsplit('.', 1)[-1], ()) if x.endswith(suffix))
+
+    def lookup(self, name: str) -> Optional[str]:
+        """
+        :param name: case-folded name, either qualified, partially qualified or simple
+        :return: qualified name of the matching object, the first one if it is ambiguous, or None if there is none
+        """
+        candidates = self.candidates(name)
+        return candidates[0] if candidates else None
@@ -5,8 +5,8 @@
 #
 # SPDX-License-Identifier: BSD-3-Clause
 
-from collections import defaultdict
-from typing import Iterable, Tuple, List, Optional, Union
+from collections import deque
+from typing import Iterable, Tuple, List, Optional, Set, Union
 
 from docutils import nodes
 from docutils.statemachine import StringList
@@ -16,21 +16,100 @@ from sphinx import addnodes
 from sphinx.addnodes import desc_signature, pending_xref
 from sphinx.application import Sphinx
 from sphinx.directives import ObjectDescription, ObjDescT
-from sphinx.domains import Domain, Index, IndexEntry
+from sphinx.domains import Domain, Index, IndexEntry, ObjType
 from sphinx.roles import XRefRole
 from sphinx.util.docutils import SphinxDirective
 from sphinx.util.nodes import make_refnode
 from sphinx.util import logging
 
 from . import autodoc
+from . import inventory
+from . import service
+from . import shards
+from .symbols import IdentifierTable, SymbolRefs, SymbolStore
 
 logger = logging.getLogger(__name__)
 
 def init_autodoc(domain: Domain):
-    if not domain.data['autodoc_initialized']:
-        domain.data['autodoc_initialized'] = True
-        autodoc.init(domain.env.app.config.vhdl_autodoc_source_path)
+    domain.data['autodoc_docs'].setdefault(domain.env.docname, set())
+    parse_autodoc_sources(domain)
+
+
+def parse_autodoc_sources(domain: Domain):
+    if not autodoc.initialized:
+        autodoc.initialized = True
+        config = domain.env.app.config
+        if autodoc.sources is None:
+            # The sources were not listed before the documents were read, the digest is stored for the next build
+            autodoc.sources, domain.data['autodoc_digest'] = autodoc.collect_sources(config.vhdl_autodoc_source_path,
+                                                                                     config.vhdl_autodoc_libraries)
+        if config.vhdl_autodoc_service:
+            parsed = service.fetch(config.vhdl_autodoc_service, autodoc.sources, domain.symbols)
+        else:
+            parsed = False
+        if not parsed:
+            autodoc.init(config.vhdl_autodoc_source_path, domain.symbols, config.vhdl_autodoc_libraries, autodoc.sources)
         logger.info('SPHINX-VHDL: Parsing of VHDL files completed.')
+        if config.vhdl_autodoc_diagnostics:
+            autodoc.write_diagnostics(config.vhdl_autodoc_diagnostics)
+
+
+def reset_autodoc(app: Sphinx) -> None:
+    """
+    Forgets the sources parsed for an earlier application in this process, the parsed objects belong to
+    the sources of one project
+    """
+    autodoc.initialized = False
+    autodoc.sources = None
+    autodoc.clear_stores()
+
+
+def check_autodoc_sources(app: Sphinx, env: "BuildEnvironment", added: Set[str], changed: Set[str],
+                          removed: Set[str]) -> List[str]:
+    """
+    Lists the VHDL sources and, when the manifests, the list of the sources or the sources themselves have
+    changed since the last build, marks the documents whose parsed objects have changed as outdated. The other
+    documents are neither read nor written again.
+    """
+    domain = env.domains['vhdl']
+    if not domain.data['autodoc_docs']:
+        # No document uses the automatic documentation, the sources are not even listed
+        return []
+    autodoc.sources, digest = autodoc.collect_sources(app.config.vhdl_autodoc_source_path,
+                                                      app.config.vhdl_autodoc_libraries)
+    if digest == domain.data['autodoc_digest']:
+        return []
+    domain.data['autodoc_digest'] = digest
+    candidates = [x for x in sorted(domain.data['autodoc_docs']) if x in env.found_docs and x not in changed and x not in added]
+    if not candidates:
+        return []
+    if autodoc.initialized:
+        # The sources were parsed by an earlier build in this process, before they changed
+        autodoc.initialized = False
+        autodoc.clear_stores()
+    parse_autodoc_sources(domain)
+    return [x for x in candidates
+            if domain.data['autodoc_hashes'].get(x) != autodoc.uses_digest(domain.data['autodoc_docs'][x])]
+
+
+def note_autodoc_use(env: "BuildEnvironment", store: dict, name: str) -> None:
+    """
+    Records that the current document looks up a parsed object, see :py:func:`.autodoc.uses_digest`
+    :param env: the build environment
+    :param store: the store the object is looked up in
+    :param name: case-folded name the object is looked up by
+    """
+    store_name = next(x for x, y in autodoc.parsed_stores().items() if y is store)
+    env.domains['vhdl'].data['autodoc_docs'].setdefault(env.docname, set()).add((store_name, name))
+
+
+def note_autodoc_digest(app: Sphinx, doctree: nodes.document) -> None:
+    """
+    Stores the digest of the parsed objects used by the document just read
+    """
+    data = app.env.domains['vhdl'].data
+    if app.env.docname in data['autodoc_docs']:
+        data['autodoc_hashes'][app.env.docname] = autodoc.uses_digest(data['autodoc_docs'][app.env.docname])
 
 
 class VHDLEnumTypeDirective(ObjectDescription):
@@ -45,12 +124,12 @@ class VHDLEnumTypeDirective(ObjectDescription):
         return sig
 
     def add_target_and_index(self, name: ObjDescT, sig: str, signode: desc_signature) -> None:
-        name = f'vhdl-enum-{sig.lower()}'
+        domain = self.env.domains['vhdl']
+        name = f'vhdl-enum-{domain.symbols.fold(sig)}'
         signode['ids'].append(name)
         if 'noindex' not in self.options:
-            self.env.domaindata['vhdl']['types'].append((name, sig, 'Enumeration', self.env.docname))
-            self.env.domaindata['vhdl']['refs']['types'][sig.split('.')[-1].lower()].append(
-                (sig.lower(), (self.env.docname, name)))
+            domain.note_type(name, sig, 'Enumeration', self.env.docname)
+            domain.note_ref('types', sig.split('.')[-1], sig, self.env.docname, name)
 
 
 class VHDLRecordTypeDirective(ObjectDescription):
@@ -65,12 +144,12 @@ class VHDLRecordTypeDirective(ObjectDescription):
         return sig
 
     def add_target_and_index(self, name: ObjDescT, sig: str, signode: desc_signature) -> None:
-        name = f'vhdl-record-{sig.lower()}'
+        domain = self.env.domains['vhdl']
+        name = f'vhdl-record-{domain.symbols.fold(sig)}'
         signode['ids'].append(name)
         if 'noindex' not in self.options:
-            self.env.domaindata['vhdl']['types'].append((name, sig, 'Record', self.env.docname))
-            self.env.domaindata['vhdl']['refs']['types'][sig.split('.')[-1].lower()].append(
-                (sig.lower(), (self.env.docname, name)))
+            domain.note_type(name, sig, 'Record', self.env.docname)
+            domain.note_ref('types', sig.split('.')[-1], sig, self.env.docname, name)
 
 
 class VHDLGeneralTypeDirective(ObjectDescription):
@@ -89,12 +168,14 @@ class VHDLGeneralTypeDirective(ObjectDescription):
         return sig
 
     def add_target_and_index(self, name: ObjDescT, sig: str, signode: desc_signature) -> None:
-        name = f'vhdl-type-{sig.lower()}'
+        domain = self.env.domains['vhdl']
+        # The signature may include the definition of the type, `name : definition`
+        type_name = sig.split(':')[0].strip()
+        name = f'vhdl-type-{domain.symbols.fold(type_name)}'
         signode['ids'].append(name)
         if 'noindex' not in self.options:
-            self.env.domaindata['vhdl']['types'].append((name, sig, 'Type', self.env.docname))
-            self.env.domaindata['vhdl']['refs']['types'][sig.split('.')[-1].lower()].append(
-                (sig.lower(), (self.env.docname, name)))
+            domain.note_type(name, sig, 'Type', self.env.docname)
+            domain.note_ref('types', type_name.split('.')[-1], type_name, self.env.docname, name)
 
 class VHDLEnumValDirective(ObjectDescription):
     has_content = True
@@ -143,12 +224,11 @@ class VHDLEntityDirective(ObjectDescription):
         return sig
 
     def add_target_and_index(self, name: ObjDescT, sig: str, signode: desc_signature) -> None:
-        name = f'vhdl-entity-{sig.lower()}'
+        domain = self.env.domains['vhdl']
+        name = f'vhdl-entity-{domain.symbols.fold(sig)}'
         signode['ids'].append(name)
         if 'noindex' not in self.options:
-            self.env.domaindata['vhdl']['refs']['entity'][sig.split('.')[-1].lower()].append(
-                (sig.lower(), (self.env.docname, name))
-            )
+            domain.note_ref('entity', sig.split('.')[-1], sig, self.env.docname, name)
 
 
 class VHDLEntityIOGenericDirective(SphinxDirective):
@@ -161,7 +241,18 @@ class VHDLEntityIOGenericDirective(SphinxDirective):
     def get_fields_from_definition(self, definition: str) -> Union[Tuple[str, str, str], Tuple[str, str, str, str]]:
         raise NotImplementedError
 
+    def type_entry(self, definition: str, type_expression: str) -> nodes.entry:
+        """
+        :param definition: the definition of the port or generic from the content
+        :param type_expression: its type, which may contain reStructuredText markup
+        :return: the table cell with the type
+        """
+        type_node = nodes.entry('')
+        self.state.nested_parse(StringList(initlist=[type_expression]), 0, type_node)
+        return type_node
+
     def run(self):
+        domain = self.env.domains['vhdl']
         table = nodes.table()
         group = nodes.tgroup()
         table += group
@@ -172,14 +263,7 @@ class VHDLEntityIOGenericDirective(SphinxDirective):
         index = 0
         has_groups = False
         has_group_desc = False
-
-        # Get all fields from ports or generics
-        # Then check if ports or generics have groups and group description
-        while len(self.content) > index:
-            if len(self.content[index]) > 0 and not self.content[index][0].isspace():
-                fields = self.get_fields_from_definition(self.content[index])
-            index += 1
-        index = 0
+        skip_description = False  # Set after a malformed definition, whose description is skipped too
 
         row: Optional[nodes.row]
         row = nodes.row()
@@ -208,24 +292,38 @@ class VHDLEntityIOGenericDirective(SphinxDirective):
         # Fill the table with content
         while len(self.content) > index:
             if len(self.content[index]) > 0 and not self.content[index][0].isspace():
+                # A malformed definition only costs its own row, not the whole table
+                try:
+                    fields = self.get_fields_from_definition(self.content[index])
+                except ValueError as e:
+                    logger.warning(f"SPHINX-VHDL: {e}; the {self.id_title} is skipped", location=self.get_location())
+                    if row is not None:
+                        self.state.nested_parse(current_description_lines.get_indented()[0], 0, description_entry)
+                        body += row
+                        row = None
+                    description_entry = nodes.entry('')
+                    current_description_lines = StringList()
+                    skip_description = True
+                    index += 1
+                    continue
+                skip_description = False
 
                 if row is not None:
                     body += row
                 row = nodes.row()
-                fields = self.get_fields_from_definition(self.content[index])
                 has_groups = has_groups or len(fields) >= 4
 
                 # If there is a group then fill first line of table with name of group, separators and description
                 if has_groups:
                     if current_group != (fields[0]):
                         current_group = (fields[0])
-                        has_group_desc = len(autodoc.groups_desc[current_group]) != 0 and has_groups
+                        has_group_desc = len(autodoc.groups_desc.get(current_group, [])) != 0 and has_groups
 
                         # Create nodes that contains name and description of group
                         group_name = nodes.entry('')
                         group_desc = nodes.entry('')
                         self.state.nested_parse(StringList(initlist=[fields[0].split(' ', 1)[1]]), 0, group_name)
-                        self.state.nested_parse(StringList(autodoc.groups_desc[current_group]), 0, group_desc)
+                        self.state.nested_parse(StringList(autodoc.groups_desc.get(current_group, [])), 0, group_desc)
 
                         # Create row that contains information about group (name, description and separators)
                         separator = "====="
@@ -244,18 +342,13 @@ class VHDLEntityIOGenericDirective(SphinxDirective):
                 # Fill the table with content
                 if len(fields) == 3:
                     fields = "", fields[0], fields[1], fields[2]
-                row_id = f'vhdl-{self.id_title}-{self.arguments[0].lower()}-{fields[1].lower()}'
-                self.env.domaindata['vhdl']['refs'][self.id_title][fields[1].lower()].append(
-                    (self.arguments[0].lower(), (self.env.docname, row_id)))
+                row_id = f'vhdl-{self.id_title}-{domain.symbols.fold(self.arguments[0])}-{domain.symbols.fold(fields[1])}'
+                domain.note_ref(self.id_title, fields[1], self.arguments[0], self.env.docname, row_id)
                 row['ids'].append(row_id)
 
                 row += nodes.entry('', nodes.paragraph('', nodes.Text(fields[1])))
 
-                refnode = pending_xref(refdomain='vhdl', reftype='type', reftarget=fields[2])
-                refnode += nodes.Text(fields[2])
-                type_node = nodes.entry('')
-                self.state.nested_parse(StringList(initlist=[fields[2]]), 0, type_node)
-                row += type_node
+                row += self.type_entry(self.content[index], fields[2])
 
                 row += nodes.entry('', nodes.paragraph('', nodes.Text(fields[3])))
 
@@ -263,7 +356,7 @@ class VHDLEntityIOGenericDirective(SphinxDirective):
                 description_entry = nodes.entry('')
                 row += description_entry
                 current_description_lines = StringList()
-            else:
+            elif not skip_description:
                 current_description_lines.append(self.content[index], source=self.content.info(index))
             index += 1
         if row is not None:
@@ -380,16 +473,16 @@ class VHDLAutoEntityDirective(VHDLEntityDirective):
 
     def handle_signature(self, sig: str, signode: desc_signature) -> ObjDescT:
         init_autodoc(self.env.domains['vhdl'])
-        try:
-            my_entity = autodoc.entities[sig.lower()]
-            self.content = self.content + StringList(['', ''] + autodoc.entities[sig.lower()])
+        identifier = find_autodoc_object(self, autodoc.entities, sig, 'Entity')
+        if identifier is None:
+            logger.warning(f"SPHINX-VHDL: Entity {sig.lower()} was not found in parsed VHDL files!", location=self.get_location())
+            self.content = self.content + StringList(["SPHINX-VHDL: Entity was not found in parsed VHDL files!"])
+        else:
+            self.content = self.content + StringList(['', ''] + autodoc.entities[identifier])
             if 'noautogenerics' not in self.options:
                 self.content = self.content + StringList(['', f'.. vhdl:autogenerics:: {sig}', ''])
             if 'noautoports' not in self.options:
                 self.content = self.content + StringList(['', f'.. vhdl:autoports:: {sig}', ''])
-        except:
-            logger.warning(f"SPHINX-VHDL: Entity {sig.lower()} was not found in parsed VHDL files!", location=self.get_location())
-            self.content = self.content + StringList([f"SPHINX-VHDL: Entity was not found in parsed VHDL files!"])
 
         return super().handle_signature(sig, signode)
 
@@ -397,8 +490,14 @@ class VHDLAutoEntityDirective(VHDLEntityDirective):
 class VHDLAutoRecordDirective(VHDLRecordTypeDirective):
     def handle_signature(self, sig: str, signode: desc_signature) -> ObjDescT:
         init_autodoc(self.env.domains['vhdl'])
-        self.content = self.content + StringList(['', ''] + autodoc.records[sig])
-        for key, value in autodoc.record_elements[sig].items():
+        identifier = find_autodoc_object(self, autodoc.records, sig, 'Record')
+        if identifier is None:
+            logger.warning(f"SPHINX-VHDL: Record {sig.lower()} was not found in parsed VHDL files!", location=self.get_location())
+            self.content = StringList(["SPHINX-VHDL: Record was not found in parsed VHDL files!"]) + self.content
+            return super().handle_signature(sig, signode)
+
+        self.content = self.content + StringList(['', ''] + autodoc.records[identifier])
+        for key, value in autodoc.record_elements[identifier].items():
             self.content = self.content + StringList(['', '', f'.. vhdl:recordelem:: {key}', ''] + ['  ' + x for x in value])
 
         return super().handle_signature(sig, signode)
@@ -407,14 +506,15 @@ class VHDLAutoRecordDirective(VHDLRecordTypeDirective):
 class VHDLAutoFunctionDirective(VHDLFunctionDirective):
     def handle_signature(self, sig: str, signode: desc_signature) -> ObjDescT:
         init_autodoc(self.env.domains['vhdl'])
-        identifier = get_closest_identifier(sig.lower(), list(autodoc.functions.items()))
+        identifier = find_autodoc_object(self, autodoc.functions, sig, 'Function')
         if identifier is None:
             logger.warning(f"SPHINX-VHDL: Function {sig.lower()} was not found in parsed VHDL files!", location=self.get_location())
-            self.content = StringList([f"SPHINX-VHDL: Function was not found in parsed VHDL files!"]) + self.content
+            self.content = StringList(["SPHINX-VHDL: Function was not found in parsed VHDL files!"]) + self.content
             sig = f'{sig.lower()} Unknown'
         else:
-            self.content = self.content + StringList(['', ''] + identifier[1])
-            sig = f'{identifier[0].split(".")[-1]} {identifier[0].split(".")[0]}'
+            return_type, doc = autodoc.functions[identifier]
+            self.content = self.content + StringList(['', ''] + doc)
+            sig = f'{identifier.split(".")[-1]} {return_type or "Unknown"}'
 
         return super().handle_signature(sig, signode)
 
@@ -422,8 +522,14 @@ class VHDLAutoFunctionDirective(VHDLFunctionDirective):
 class VHDLAutoEnumDirective(VHDLEnumTypeDirective):
     def handle_signature(self, sig: str, signode: desc_signature) -> ObjDescT:
         init_autodoc(self.env.domains['vhdl'])
-        self.content = self.content + StringList(['', ''] + autodoc.enums[sig])
-        for key, value in autodoc.enumvals[sig].items():
+        identifier = find_autodoc_object(self, autodoc.enums, sig, 'Enumeration')
+        if identifier is None:
+            logger.warning(f"SPHINX-VHDL: Enumeration {sig.lower()} was not found in parsed VHDL files!", location=self.get_location())
+            self.content = StringList(["SPHINX-VHDL: Enumeration was not found in parsed VHDL files!"]) + self.content
+            return super().handle_signature(sig, signode)
+
+        self.content = self.content + StringList(['', ''] + autodoc.enums[identifier])
+        for key, value in autodoc.enumvals[identifier].items():
             self.content = self.content + StringList(['', '', f'.. vhdl:enumval:: {key}', ''] + ['  ' + x for x in value])
         return super().handle_signature(sig, signode)
 
@@ -431,35 +537,47 @@ class VHDLAutoEnumDirective(VHDLEnumTypeDirective):
 class VHDLAutoPackageDirective(VHDLPackagesDirective):
     def handle_signature(self, sig: str, signode: desc_signature) -> ObjDescT:
         init_autodoc(self.env.domains['vhdl'])
-        identifier = get_closest_identifier(sig.lower(), list(autodoc.packages.items()))
+        identifier = find_autodoc_object(self, autodoc.packages, sig, 'Package')
         if identifier is None:
             logger.warning(f"SPHINX-VHDL: Package {sig.lower()} was not found in parsed VHDL files!", location=self.get_location())
-            self.content = StringList([f"SPHINX-VHDL: Package was not found in parsed VHDL files!"]) + self.content
+            self.content = StringList(["SPHINX-VHDL: Package was not found in parsed VHDL files!"]) + self.content
         else:
-            self.content = StringList(identifier[1] + ['', '']) + self.content
+            self.content = StringList(autodoc.packages[identifier] + ['', '']) + self.content
         return super().handle_signature(sig, signode)
 
 
 class VHDLAutoPortsDirective(VHDLPortsDirective):
     has_content = False
+    identifier: Optional[str] = None
+
+    def type_entry(self, definition: str, type_expression: str) -> nodes.entry:
+        return linked_type_entry(self, self.identifier, definition, type_expression)
 
     def run(self):
         init_autodoc(self.env.domains['vhdl'])
+        identifier = self.identifier = find_autodoc_object(self, autodoc.entities, self.arguments[0], 'Entity')
+        definitions = autodoc.portsignals.get(identifier, {})
         self.content = StringList(
-            [item for subitem in [[key, *[f'  {x}' for x in autodoc.portsignals[self.arguments[0].lower()][key]]]
-                                  for key in autodoc.portsignals[self.arguments[0].lower()].keys()] for item in subitem]
+            [item for subitem in [[key, *[f'  {x}' for x in definitions[key]]]
+                                  for key in definitions.keys()] for item in subitem]
         )
         return super().run()
 
 
 class VHDLAutoGenericsDirective(VHDLGenericsDirective):
     has_content = False
+    identifier: Optional[str] = None
+
+    def type_entry(self, definition: str, type_expression: str) -> nodes.entry:
+        return linked_type_entry(self, self.identifier, definition, type_expression)
 
     def run(self):
         init_autodoc(self.env.domains['vhdl'])
+        identifier = self.identifier = find_autodoc_object(self, autodoc.entities, self.arguments[0], 'Entity')
+        definitions = autodoc.generics.get(identifier, {})
         self.content = StringList(
-            [item for subitem in [[key, *[f'  {x}' for x in autodoc.generics[self.arguments[0].lower()][key]]]
-                                  for key in autodoc.generics[self.arguments[0].lower()].keys()] for item in subitem]
+            [item for subitem in [[key, *[f'  {x}' for x in definitions[key]]]
+                                  for key in definitions.keys()] for item in subitem]
         )
         return super().run()
 
@@ -468,9 +586,11 @@ class VHDLAutoConstantsDirective(VHDLConstantsDirective):
 
     def run(self):
         init_autodoc(self.env.domains['vhdl'])
+        identifier = find_autodoc_object(self, autodoc.constants, self.arguments[0], 'Architecture')
+        definitions = autodoc.constants.get(identifier, {})
         self.content = StringList(
-            [item for subitem in [[key, *[f'  {x}' for x in autodoc.constants[self.arguments[0].lower()][key]]]
-                                  for key in autodoc.constants[self.arguments[0].lower()].keys()] for item in subitem]
+            [item for subitem in [[key, *[f'  {x}' for x in definitions[key]]]
+                                  for key in definitions.keys()] for item in subitem]
         )
         return super().run()
 
@@ -478,14 +598,65 @@ class VHDLAutoTypeDirective(VHDLGeneralTypeDirective):
 
     def handle_signature(self, sig: str, signode: desc_signature) -> ObjDescT:
         init_autodoc(self.env.domains['vhdl'])
-        identifier = get_closest_identifier(sig.lower(), autodoc.types.items())
+        identifier = find_autodoc_object(self, autodoc.types, sig, 'Type')
         if identifier is None:
             logger.warning(f"SPHINX-VHDL: Type {sig.lower()} was not found in parsed VHDL files!", location=self.get_location())
-            self.content = StringList([f"SPHINX-VHDL: Type was not found in parsed VHDL files!"]) + self.content
+            self.content = StringList(["SPHINX-VHDL: Type was not found in parsed VHDL files!"]) + self.content
             return super().handle_signature(sig + " : Unknown", signode)
         else:
-            self.content = self.content + StringList(['', ''] + identifier[1][1])
-            return super().handle_signature(sig + " : " + identifier[1][0], signode)
+            definition, doc = autodoc.types[identifier]
+            self.content = self.content + StringList(['', ''] + doc)
+            return super().handle_signature(sig + " : " + definition, signode)
+
+
+class VHDLHierarchyDirective(SphinxDirective):
+    """
+    Renders the tree of instances under an entity as nested lists. The instances of each entity are
+    listed only at its first (shallowest) occurrence, so the size of the tree is bounded by the number of
+    instantiations in the sources, not by the number of instances in the elaborated design.
+    """
+    has_content = False
+    required_arguments = 1
+    option_spec = {
+        'depth': directives.nonnegative_int,
+    }
+
+    def make_entity_ref(self, name: str) -> pending_xref:
+        refnode = pending_xref(refdomain='vhdl', reftype='entity', reftarget=name, refdoc=self.env.docname)
+        refnode += nodes.literal(text=name)
+        return refnode
+
+    def run(self):
+        domain = self.env.domains['vhdl']
+        init_autodoc(domain)
+        top = find_autodoc_object(self, autodoc.instances, self.arguments[0], 'Entity')
+        depth = self.options.get('depth')
+
+        tree = nodes.bullet_list()
+        top_item = nodes.list_item('', nodes.paragraph('', '', self.make_entity_ref(self.arguments[0])))
+        tree += top_item
+        if top is None:
+            logger.warning(f"SPHINX-VHDL: No instances of entity {self.arguments[0].lower()} were found in parsed VHDL files!", location=self.get_location())
+            return [tree]
+
+        expanded = {top}
+        queue = deque([(top, top_item, 0)])
+        while queue:
+            entity, item, level = queue.popleft()
+            if entity not in autodoc.instances or (depth is not None and level >= depth):
+                continue
+            children = nodes.bullet_list()
+            item += children
+            for label, unit in autodoc.instances[entity]:
+                child_item = nodes.list_item('', nodes.paragraph('', '', nodes.Text(f'{label} : '), self.make_entity_ref(unit)))
+                children += child_item
+                # Components and entities instantiated without their library are resolved by their name
+                note_autodoc_use(self.env, autodoc.instances, unit)
+                unit = autodoc.instances.lookup(unit)
+                if unit is not None and unit not in expanded:
+                    expanded.add(unit)
+                    queue.append((unit, child_item, level + 1))
+        return [tree]
 
 
 class VHDLTypeIndex(Index):
@@ -497,10 +668,12 @@ class VHDLTypeIndex(Index):
         super(VHDLTypeIndex, self).__init__(*args, **kwargs)
 
     def generate(self, docnames: Iterable[str] = None) -> Tuple[List[Tuple[str, List[IndexEntry]]], bool]:
+        types = self.domain.data['types']
         if docnames is not None:
-            type_list = sorted([x for x in self.domain.data['types'] if x[3] in docnames], key=lambda x: x[1])
+            docnames = [x for x in docnames if x in types]
         else:
-            type_list = sorted(self.domain.data['types'], key=lambda x: x[1])
+            docnames = types.keys()
+        type_list = sorted([x for docname in docnames for x in types[docname]], key=lambda x: (x[1], x[3], x[0]))
 
         result: List[Tuple[str, List[IndexEntry]]] = []
         for name, sig, kind, docname in type_list:
@@ -509,6 +682,67 @@ class VHDLTypeIndex(Index):
         return result, True
 
 
+def find_autodoc_object(directive: SphinxDirective, store: SymbolStore, name: str, kind: str) -> Optional[str]:
+    """
+    Looks up an object parsed from the VHDL sources by its name, warns when the name is ambiguous
+    :param directive: the directive looking up the object, used for the location of warnings
+    :param store: the parsed objects of one kind
+    :param name: qualified (``library.package.name``), partially qualified or simple name of the object
+    :param kind: kind of the object used in warnings
+    :return: qualified name of the object in the store or None if it was not found
+    """
+    folded_name = directive.env.domains['vhdl'].symbols.fold(name)
+    note_autodoc_use(directive.env, store, folded_name)
+    candidates = store.candidates(folded_name)
+    # Auto-directives generated by other ones look up the same name again, so each name is reported once per document
+    reported = directive.env.temp_data.setdefault('vhdl_ambiguous_names', set())
+    if len(candidates) > 1 and (kind, name.lower()) not in reported:
+        reported.add((kind, name.lower()))
+        logger.warning(f"SPHINX-VHDL: {kind} {name.lower()} is ambiguous, it may be any of {', '.join(candidates)}; "
+                       f"using {candidates[0]}. Qualify the name with its library to select another one.",
+                       location=directive.get_location())
+    return candidates[0] if candidates else None
+
+
+def linked_type_entry(directive: SphinxDirective, identifier: Optional[str], definition: str,
+                      type_expression: str) -> nodes.entry:
+    """
+    Builds the table cell with the type of a parsed port or generic from the segments of its type expression
+    resolved by the parser, see :py:data:`.autodoc.type_links`, instead of parsing the type as reStructuredText
+    :param directive: the auto directive of the ports or generics
+    :param identifier: qualified name of the entity
+    :param definition: the definition of the port or generic
+    :param type_expression: its type, used when the parser has not resolved it
+    :return: the table cell with the type
+    """
+    segments = autodoc.type_links.get(identifier, {}).get(definition, ((type_expression, None, None),))
+    paragraph = nodes.paragraph()
+    for text, reftype, target in segments:
+        if reftype is None:
+            paragraph += nodes.Text(text)
+            continue
+        if reftype == 'gengeneric':
+            target = f'{directive.arguments[0]}.{target}'
+        # Linked by the parser whether or not the target is documented, see unresolved_type_link()
+        refnode = pending_xref(refdomain='vhdl', reftype=reftype, reftarget=target, refdoc=directive.env.docname,
+                               vhdl_prelinked=True)
+        directive.set_source_info(refnode)
+        refnode += nodes.Text(text)
+        paragraph += refnode
+    return nodes.entry('', paragraph)
+
+
+def unresolved_type_link(app: Sphinx, env: "BuildEnvironment", node: pending_xref,
+                         contnode: nodes.Element) -> Optional[nodes.Element]:
+    """
+    Renders a type or generic linked by the parser, see :py:func:`linked_type_entry`, as plain text when it is
+    not documented anywhere, instead of warning about a missing reference target
+    """
+    if node.get('vhdl_prelinked'):
+        return contnode
+    return None
+
+
 def get_closest_identifier(target_identifier: str, search_through: List[Tuple[str, ObjDescT]]):
     """
     Finds the item with the closes matching identifier to a target one in a list
@@ -533,6 +767,21 @@ def get_closest_identifier(target_identifier: str, search_through: List[Tuple[st
         return None
 
 
+def find_target(target: str, simple_name: str, candidates: Iterable[Tuple[str, ObjDescT]]) -> Optional[Tuple[str, ObjDescT]]:
+    """
+    Selects the target of a reference among the targets with the same simple name
+    :param target: case-folded name of the reference, qualified or not
+    :param simple_name: case-folded simple name of the reference
+    :param candidates: pairs of the case-folded qualified name of a target and its address
+    :return: the pair whose qualified name (or the name of its entity and the simple name for ports and generics)
+        is the target, otherwise the closest one, see :py:func:`get_closest_identifier`; None if none matches
+    """
+    # Sorted, so the result does not depend on the order the targets were found in
+    candidates = sorted(candidates)
+    exact = next((x for x in candidates if x[0] == target or f'{x[0]}.{simple_name}' == target), None)
+    return exact if exact is not None else get_closest_identifier(target, candidates)
+
+
 class VHDLDomain(Domain):
     name = 'vhdl'
     label = 'VHDL Language'
@@ -558,22 +807,36 @@ class VHDLDomain(Domain):
         'record': VHDLRecordTypeDirective,
         'recordelem': VHDLRecordElementDirective,
         'type': VHDLGeneralTypeDirective,
+        'hierarchy': VHDLHierarchyDirective,
     }
+    _symbols = IdentifierTable()
     initial_data = {
-        'types': [],
+        'types': {},  # docname -> list of (anchor, signature, type kind, docname)
         'refs': {
-            'types': defaultdict(list),
-            'portsignal': defaultdict(list),
-            'gengeneric': defaultdict(list),
-            'genconstant': defaultdict(list),
-            'parameters': defaultdict(list),
-            'entity': defaultdict(list),
+            'types': SymbolRefs(_symbols),
+            'portsignal': SymbolRefs(_symbols),
+            'gengeneric': SymbolRefs(_symbols),
+            'genconstant': SymbolRefs(_symbols),
+            'parameters': SymbolRefs(_symbols),
+            'entity': SymbolRefs(_symbols),
         },
-        'autodoc_initialized': False
+        'symbols': _symbols,
+        'autodoc_docs': {},  # documents using the automatic documentation: the parsed objects they look up
+        'autodoc_hashes': {},  # digests of the parsed objects used by the documents when they were read
+        'autodoc_digest': '',  # digest of the VHDL sources the automatic documentation was built from
     }
+    data_version = 4
     indices = {
         VHDLTypeIndex
     }
+    object_types = {
+        'type': ObjType('type', 'type'),
+        'entity': ObjType('entity', 'entity'),
+        'portsignal': ObjType('port', 'portsignal'),
+        'gengeneric': ObjType('generic', 'gengeneric'),
+        'genconstant': ObjType('constant', 'genconstant'),
+        'parameters': ObjType('parameter'),
+    }
     roles = {
         'portsignal': XRefRole(),
         'genconstant': XRefRole(),
@@ -582,6 +845,58 @@ class VHDLDomain(Domain):
         'entity': XRefRole(),
     }
 
+    @property
+    def symbols(self) -> IdentifierTable:
+        """
+        Identifier table of the project, the refs data are keyed by ids from this table
+        """
+        return self.data['symbols']
+
+    def note_type(self, anchor: str, sig: str, kind: str, docname: str) -> None:
+        """
+        Registers a type in the type index
+        :param anchor: id of the target node
+        :param sig: signature of the type
+        :param kind: kind of the type shown in the index ('Enumeration', 'Record' or 'Type')
+        :param docname: document containing the type
+        """
+        self.data['types'].setdefault(docname, []).append((anchor, sig, kind, docname))
+
+    def note_ref(self, kind: str, name: str, qualified_name: str, docname: str, anchor: str) -> None:
+        """
+        Registers a target of references
+        :param kind: key of the refs data ('types', 'entity', 'portsignal', ...)
+        :param name: simple name the target is referenced by
+        :param qualified_name: the name of the target itself, or of its entity for ports and generics
+        :param docname: document containing the target
+        :param anchor: id of the target node
+        """
+        self.data['refs'][kind].add(self.symbols.intern(name), self.symbols.intern(qualified_name), docname, anchor)
+
+    def clear_doc(self, docname: str) -> None:
+        self.data['types'].pop(docname, None)
+        for refs in self.data['refs'].values():
+            refs.remove_doc(docname)
+        self.data['autodoc_docs'].pop(docname, None)
+        self.data['autodoc_hashes'].pop(docname, None)
+
+    def merge_domaindata(self, docnames: Set[str], otherdata: dict) -> None:
+        other_symbols = otherdata['symbols']
+        for docname in otherdata['types'].keys() & docnames:
+            self.data['types'][docname] = otherdata['types'][docname]
+        for kind, refs in otherdata['refs'].items():
+            for name_id, targets in refs.items():
+                for qualified_id, (docname, anchor) in targets:
+                    if docname in docnames:
+                        self.note_ref(kind, other_symbols.name(name_id), other_symbols.name(qualified_id), docname, anchor)
+        for docname in otherdata['autodoc_docs'].keys() & docnames:
+            self.data['autodoc_docs'][docname] = otherdata['autodoc_docs'][docname]
+        for docname in otherdata['autodoc_hashes'].keys() & docnames:
+            self.data['autodoc_hashes'][docname] = otherdata['autodoc_hashes'][docname]
+        if otherdata['autodoc_digest']:
+            # The sources may have been parsed by the process which read the documents
+            self.data['autodoc_digest'] = otherdata['autodoc_digest']
+
     def resolve_xref(self, env: "BuildEnvironment", fromdocname: str, builder: "Builder", typ: str, target: str,
                      node: pending_xref, contnode: nodes.Element) -> Optional[nodes.Element]:
         if typ == 'type':
@@ -596,9 +911,12 @@ class VHDLDomain(Domain):
             index = self.data['refs']['entity']
         elif True:
             raise NotImplementedError
-        simple_name = target.split('.')[-1].lower()
+        simple_name = self.symbols.lookup(target.split('.')[-1])
         if simple_name in index:
-            target_address = get_closest_identifier(target.lower(), index[simple_name])
+            target = self.symbols.fold(target)
+            target_address = find_target(target, self.symbols.name(simple_name),
+                                         [(self.symbols.name(qualified_name), address)
+                                          for qualified_name, address in index[simple_name]])
             if target_address is None:
                 logger.warning(f"SPHINX-VHDL: Unknown reference {target} discovered by resolve_xref function!")
             else:
@@ -607,13 +925,91 @@ class VHDLDomain(Domain):
                                     target_address[1][1],
                                     contnode)
                 return result
+        return self.resolve_shard_xref(builder, fromdocname, typ, target, contnode) or \
+            self.resolve_external_xref(typ, target, contnode)
+
+    def resolve_shard_xref(self, builder: "Builder", fromdocname: str, typ: str, target: str,
+                           contnode: nodes.Element) -> Optional[nodes.Element]:
+        """
+        Resolves a reference not found in this build against the shards of the other partial builds
+        from ``vhdl_shard_inputs``
+        """
+        index = shards.load_shards(self.env.config.vhdl_shard_inputs, self.env.all_docs)
+        if index is None:
+            return None
+        kind = inventory.INVENTORY_TYPES[typ]
+        simple_name = self.symbols.fold(target.split('.')[-1])
+        if simple_name not in index.refs[kind]:
+            return None
+        target_address = find_target(self.symbols.fold(target), simple_name, index.refs[kind][simple_name])
+        if target_address is None:
+            return None
+        return make_refnode(builder, fromdocname, target_address[1][0], target_address[1][1], contnode)
+
+    def resolve_external_xref(self, typ: str, target: str, contnode: nodes.Element) -> Optional[nodes.Element]:
+        """
+        Resolves a reference not found in this project against the inventories from ``vhdl_inventories``
+        """
+        kind = inventory.INVENTORY_TYPES[typ]
+        simple_name = self.symbols.fold(target.split('.')[-1])
+        for name, (uri, location) in self.env.config.vhdl_inventories.items():
+            external = inventory.load_inventory(name, uri, location, self.env.app.confdir,
+                                                self.env.config.vhdl_inventory_timeout)
+            if external is None or simple_name not in external.refs[kind]:
+                continue
+            target_address = find_target(self.symbols.fold(target), simple_name, external.refs[kind][simple_name])
+            if target_address is not None:
+                result = nodes.reference('', '', internal=False, refuri=target_address[1][0],
+                                         reftitle=f'(in {external.project or name})')
+                result += contnode
+                return result
+        return None
+
+    def get_objects(self) -> Iterable[Tuple[str, str, str, str, str, int]]:
+        for objtype, kind in inventory.INVENTORY_TYPES.items():
+            for simple_name, targets in self.data['refs'][kind].items():
+                simple_name = self.symbols.name(simple_name)
+                for qualified_name, (docname, anchor) in targets:
+                    qualified_name = self.symbols.name(qualified_name)
+                    if kind in ('types', 'entity'):
+                        fullname = qualified_name
+                    else:
+                        fullname = f'{qualified_name}.{simple_name}'
+                    # Names and anchors with whitespace cannot be written to an inventory
+                    if any(x.isspace() for x in fullname + anchor):
+                        continue
+                    yield fullname, fullname, objtype, docname, anchor, 1
+
+
+def write_shard(app: Sphinx, exception: Optional[Exception]) -> None:
+    """
+    Writes the targets of the VHDL references of this build to ``vhdl_shard_output``
+    """
+    if exception is None and app.config.vhdl_shard_output:
+        shards.write_shard(app.config.vhdl_shard_output, shards.dump_shard(app.env.domains['vhdl']))
+        logger.info(f'SPHINX-VHDL: VHDL shard written to {app.config.vhdl_shard_output}.')
 
 
 def setup(app: Sphinx):
     app.add_domain(VHDLDomain)
+    app.connect('builder-inited', reset_autodoc)
+    app.connect('env-get-outdated', check_autodoc_sources)
+    app.connect('doctree-read', note_autodoc_digest)
+    app.connect('build-finished', write_shard)
+    # After the other handlers, so that the links can still be resolved e.g. by intersphinx
+    app.connect('missing-reference', unresolved_type_link, priority=900)
     app.add_config_value('vhdl_autodoc_source_path', '.', 'env', [str, list])
+    app.add_config_value('vhdl_autodoc_libraries', {}, 'env', [dict])
+    app.add_config_value('vhdl_inventories', {}, 'env', [dict])
+    app.add_config_value('vhdl_inventory_timeout', 30, '', [int, float, type(None)])
+    app.add_config_value('vhdl_shard_output', None, '', [str])
+    app.add_config_value('vhdl_shard_inputs', [], '', [list])
+    app.add_config_value('vhdl_autodoc_diagnostics', None, '', [str])
+    app.add_config_value('vhdl_autodoc_service', None, '', [str])
     logger.verbose('The sphinx-vhdl extension has been activated.')
 
     return {
-        'version': '0.2.2'
+        'version': '0.2.2',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
     }
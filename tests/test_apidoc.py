@@ -0,0 +1,74 @@
+# test_apidoc.py: Tests of the generator of reference pages of VHDL entities and packages
+# Copyright (C) 2021 CESNET z.s.p.o.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import pytest
+
+from sphinxvhdl import apidoc, autodoc
+from sphinxvhdl.symbols import IdentifierTable
+
+
+@pytest.fixture(autouse=True)
+def clear_stores():
+    autodoc.clear_stores()
+    yield
+    autodoc.clear_stores()
+
+
+def parse(source: str) -> None:
+    autodoc.parse_file('test.vhd', source.splitlines(keepends=True), 'work', IdentifierTable())
+
+
+def test_render_pages():
+    parse('-- Types\n'
+          'package p is\n'
+          '    -- States\n'
+          '    type t_state is (IDLE, RUN);\n'
+          'end package;\n'
+          '-- Counter\n'
+          'entity counter is\n'
+          '    port (\n'
+          '        -- Clock\n'
+          '        CLK : in std_logic\n'
+          '    );\n'
+          'end entity;\n')
+
+    pages = apidoc.render_pages(apidoc.create_environment(), 'vhdl')
+
+    assert sorted(pages) == ['vhdl.rst', 'work.counter.rst', 'work.p.rst']
+    assert all(x.startswith(apidoc.HEADER + '\n') for x in pages.values())
+    assert '.. vhdl:entity:: counter' in pages['work.counter.rst']
+    assert 'CLK : in std_logic' in pages['work.counter.rst']
+    assert '.. vhdl:enum:: t_state' in pages['work.p.rst']
+    assert '   work.counter\n   work.p\n' in pages['vhdl.rst']
+
+
+def test_write_pages(tmp_path):
+    pages = {'a.rst': f'{apidoc.HEADER}\n\nA\n', 'b.rst': f'{apidoc.HEADER}\n\nB\n', 'manual.rst': f'{apidoc.HEADER}\n'}
+    (tmp_path / 'manual.rst').write_text('Written by hand\n')
+
+    assert apidoc.write_pages(str(tmp_path), pages) == (2, 0, 0)
+    assert (tmp_path / 'manual.rst').read_text() == 'Written by hand\n'
+
+    (tmp_path / 'a.rst').touch()
+    mtime = (tmp_path / 'a.rst').stat().st_mtime_ns
+    pages['b.rst'] = f'{apidoc.HEADER}\n\nB changed\n'
+    assert apidoc.write_pages(str(tmp_path), pages) == (1, 1, 0)
+    assert (tmp_path / 'a.rst').stat().st_mtime_ns == mtime
+    assert (tmp_path / 'b.rst').read_text() == pages['b.rst']
+
+    assert apidoc.write_pages(str(tmp_path), pages, force=True) == (2, 0, 0)
+
+
+def test_remove_old_pages(tmp_path):
+    pages = {'a.rst': f'{apidoc.HEADER}\n\nA\n', 'b.rst': f'{apidoc.HEADER}\n\nB\n'}
+    apidoc.write_pages(str(tmp_path), pages)
+    (tmp_path / 'manual.rst').write_text('Written by hand\n')
+    del pages['b.rst']
+
+    assert apidoc.write_pages(str(tmp_path), pages) == (0, 1, 0)
+    assert (tmp_path / 'b.rst').exists()
+
+    assert apidoc.write_pages(str(tmp_path), pages, remove_old=True) == (0, 1, 1)
+    assert sorted(x.name for x in tmp_path.iterdir()) == ['a.rst', 'manual.rst']
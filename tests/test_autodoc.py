@@ -0,0 +1,144 @@
+# test_autodoc.py: Tests of the VHDL parser
+# Copyright (C) 2021 CESNET z.s.p.o.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+
+import pytest
+
+from sphinxvhdl import autodoc
+from sphinxvhdl.symbols import IdentifierTable
+
+
+@pytest.fixture(autouse=True)
+def clear_stores():
+    autodoc.clear_stores()
+    yield
+    autodoc.clear_stores()
+
+
+def parse(source: str, library: str = 'work') -> None:
+    autodoc.parse_file('test.vhd', source.splitlines(keepends=True), library, IdentifierTable())
+
+
+def test_short_package_ends():
+    parse('package p is\n'
+          '    type t_a is (A, B);\n'
+          'end p;\n'
+          'package q is\n'
+          'end;\n'
+          'package body p is\n'
+          '    function f return integer is\n'
+          '    begin\n'
+          '        return 1;\n'
+          '    end;\n'
+          'end p;\n'
+          'entity e is\n'
+          'end entity;\n')
+
+    assert autodoc.diagnostics == []
+    assert 'work.q' in autodoc.packages
+    assert 'work.e' in autodoc.entities
+
+
+def test_package_instantiation():
+    parse('package p_inst is new work.gen_pkg generic map (W => 8);\n'
+          'package q_inst is new work.gen_pkg\n'
+          '    generic map (W => 16);\n'
+          'package p is\n'
+          '    package n_inst is new work.gen_pkg generic map (W => 4);\n'
+          '    type t_a is (A, B);\n'
+          'end package;\n'
+          'entity e is\n'
+          'end entity;\n')
+
+    assert autodoc.diagnostics == []
+    assert list(autodoc.packages) == ['work.p']
+    assert 'work.p.t_a' in autodoc.enums
+    assert 'work.e' in autodoc.entities
+
+
+def test_resync_after_unterminated_port_list():
+    parse('entity broken is\n'
+          '    port (\n'
+          '        CLK : in std_logic\n'
+          'architecture full of broken is\n'
+          'begin\n'
+          'end architecture;\n'
+          '-- Good entity\n'
+          'entity good is\n'
+          '    port (\n'
+          '        D : in std_logic\n'
+          '    );\n'
+          'end entity;\n')
+
+    assert [(x.lineno, x.unit) for x in autodoc.diagnostics] == [(4, 'entity broken')]
+    assert autodoc.entities['work.good'] == ['Good entity']
+    assert list(autodoc.portsignals['work.good']) == ['D : in std_logic']
+
+
+def test_instances():
+    parse('entity top is\n'
+          'end entity;\n'
+          'architecture full of top is\n'
+          '    signal s : std_logic;\n'
+          'begin\n'
+          '    u0 : entity work.foo(full)\n'
+          '        port map (A => s);\n'
+          '    u1: component bar generic map (W => 8) port map (A => s);\n'
+          '    u2 : baz\n'
+          '        port map (A => s);\n'
+          '    u3: entity lib2.qux;\n'
+          '    u4: comp_x;\n'
+          '    u5 : component comp_y;\n'
+          '    p0 : process (s)\n'
+          '    begin\n'
+          '    end process;\n'
+          '    g0 : for i in 0 to 3 generate\n'
+          '        u6 : entity work.foo port map (A => s);\n'
+          '        u7 : comp_z;\n'
+          '    end generate;\n'
+          '    g1 : if true generate\n'
+          '        u8 : baz\n'
+          '            generic map (W => 8);\n'
+          '    end generate;\n'
+          'end architecture;\n')
+
+    assert autodoc.instances['work.top'] == [
+        ('u0', 'work.foo'), ('u1', 'bar'), ('u2', 'baz'), ('u3', 'lib2.qux'), ('u4', 'comp_x'), ('u5', 'comp_y'),
+        ('u6', 'work.foo'), ('u7', 'comp_z'), ('u8', 'baz')]
+
+
+def test_same_names_in_libraries():
+    for library in ('lib1', 'lib2'):
+        parse('package p is\n'
+              f'    -- Record of {library}\n'
+              '    type t_rec is record\n'
+              '        A : integer;\n'
+              '    end record;\n'
+              '    type t_enum is (A, B);\n'
+              '    type t_int is range 0 to 7;\n'
+              'end package;\n'
+              f'-- Entity of {library}\n'
+              'entity e is\n'
+              'end entity;\n', library)
+
+    assert autodoc.entities.candidates('e') == ['lib1.e', 'lib2.e']
+    assert autodoc.entities['lib2.e'] == ['Entity of lib2']
+    assert autodoc.records.candidates('p.t_rec') == ['lib1.p.t_rec', 'lib2.p.t_rec']
+    assert autodoc.records['lib1.p.t_rec'] == ['Record of lib1']
+    assert autodoc.enums.candidates('t_enum') == ['lib1.p.t_enum', 'lib2.p.t_enum']
+    assert autodoc.types.candidates('t_int') == ['lib1.p.t_int', 'lib2.p.t_int']
+    assert autodoc.records.lookup('lib2.p.t_rec') == 'lib2.p.t_rec'
+    assert autodoc.entities.lookup('e') == 'lib1.e'
+    assert autodoc.entities.lookup('lib3.e') is None
+
+
+def test_source_library(tmp_path):
+    libraries = {'Lib1': str(tmp_path / 'hw'), 'lib2': [str(tmp_path / 'other'), str(tmp_path / 'hw' / 'sub')]}
+
+    assert autodoc.source_library(str(tmp_path / 'hw' / 'a.vhd'), libraries) == 'lib1'
+    assert autodoc.source_library(str(tmp_path / 'hw' / 'sub' / 'b.vhd'), libraries) == 'lib2'
+    assert autodoc.source_library(str(tmp_path / 'hw_x' / 'c.vhd'), libraries) == 'work'
+    assert autodoc.source_library(os.path.join('..', 'd.vhd'), {}) == 'work'
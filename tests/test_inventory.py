@@ -0,0 +1,26 @@
+# test_inventory.py: Tests of loading VHDL objects from external Sphinx inventories
+# Copyright (C) 2021 CESNET z.s.p.o.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import zlib
+
+from sphinxvhdl import inventory
+
+
+def test_parse_inventory():
+    data = (b'# Sphinx inventory version 2\n'
+            b'# Project: ext\n'
+            b'# Version: 1.0\n'
+            b'# The remainder of this file is compressed using zlib.\n' +
+            zlib.compress(b'my_int vhdl:type 1 types.html#vhdl-type-$ -\n'
+                          b'Counter.MAX_VALUE vhdl:gengeneric 1 counter.html#vhdl-gengeneric-counter-max_value -\n'
+                          b'foo py:function 1 api.html#$ -\n'))
+
+    external = inventory.parse_inventory('ext', data, 'https://example.org/ext')
+
+    assert external.project == 'ext'
+    assert external.refs['types']['my_int'] == [('my_int', ('https://example.org/ext/types.html#vhdl-type-my_int', 'my_int'))]
+    assert external.refs['gengeneric']['max_value'] == [
+        ('counter.max_value', ('https://example.org/ext/counter.html#vhdl-gengeneric-counter-max_value', 'Counter.MAX_VALUE'))]
+    assert 'foo' not in external.refs['types']
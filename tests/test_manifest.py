@@ -0,0 +1,37 @@
+# test_manifest.py: Tests of reading VHDL source lists of build systems
+# Copyright (C) 2021 CESNET z.s.p.o.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+
+from sphinxvhdl import manifest
+
+
+def test_relative_modules_tcl(tmp_path, monkeypatch):
+    component = tmp_path / 'hw' / 'comp'
+    (component / 'sub').mkdir(parents=True)
+    (component / 'Modules.tcl').write_text(
+        'lappend COMPONENTS [list "SUB" "$ENTITY_BASE/sub" "FULL"]\n'
+        'lappend MOD "$ENTITY_BASE/foo.vhd"\n'
+        'lappend MOD "bar.vhd"\n'
+    )
+    (component / 'sub' / 'Modules.tcl').write_text('lappend MOD "$ENTITY_BASE/baz.vhd" LIBRARY sublib\n')
+    monkeypatch.chdir(tmp_path)
+
+    sources = manifest.read_manifest(os.path.join('hw', 'comp', 'Modules.tcl')).sources
+
+    assert [(os.path.abspath(path), library) for path, library in sources] == [
+        (str(component / 'sub' / 'baz.vhd'), 'sublib'),
+        (str(component / 'foo.vhd'), None),
+        (str(component / 'bar.vhd'), None),
+    ]
+
+
+def test_file_list_libraries(tmp_path, monkeypatch):
+    (tmp_path / 'sources.f').write_text('# comment\na.vhd\n-work lib1\nb.vhd // comment\n--work=lib2 c.v d.vhdl\n')
+    monkeypatch.chdir(tmp_path)
+
+    sources = manifest.read_manifest('sources.f').sources
+
+    assert sources == [('a.vhd', None), ('b.vhd', 'lib1'), ('d.vhdl', 'lib2')]
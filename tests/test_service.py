@@ -0,0 +1,95 @@
+# test_service.py: Tests of the shared VHDL parse service
+# Copyright (C) 2021 CESNET z.s.p.o.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import json
+import os
+import socket
+import threading
+
+import pytest
+
+from sphinxvhdl import autodoc, service
+from sphinxvhdl.symbols import IdentifierTable
+
+SOURCES = {
+    'pkg.vhd': 'package types_pkg is\n'
+               '    -- A word\n'
+               '    type t_word is array (15 downto 0) of bit;\n'
+               '    type t_state is (IDLE, RUN);\n'
+               'end package;\n',
+    'counter.vhd': '-- Counter\n'
+                   'entity counter is\n'
+                   '    generic (\n'
+                   '        -- Width\n'
+                   '        WIDTH : natural := 8\n'
+                   '    );\n'
+                   '    port (\n'
+                   '        -- ====\n'
+                   '        -- Data\n'
+                   '        -- ====\n'
+                   '        -- Value\n'
+                   '        VALUE : out bit_vector(WIDTH - 1 downto 0);\n'
+                   '        -- Word\n'
+                   '        WORD : in t_word\n'
+                   '    );\n'
+                   'end entity;\n'
+                   'architecture full of counter is\n'
+                   'begin\n'
+                   '    u0 : entity work.inner;\n'
+                   'end architecture;\n',
+    'other.vhd': '-- Counter of another library\n'
+                 'entity counter is\n'
+                 'end entity;\n',
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_stores():
+    autodoc.clear_stores()
+    yield
+    autodoc.clear_stores()
+
+
+@pytest.fixture
+def sources(tmp_path):
+    for name, content in SOURCES.items():
+        (tmp_path / name).write_text(content)
+    return [(str(tmp_path / 'pkg.vhd'), 'work'), (str(tmp_path / 'counter.vhd'), 'work'),
+            (str(tmp_path / 'other.vhd'), 'lib2')]
+
+
+def test_loaded_dumps_equal_parse(sources):
+    autodoc.init(None, IdentifierTable(), sources=sources)
+    parsed = autodoc.dump_stores(), {key: dict(value) for key, value in autodoc.type_links.items()}
+
+    cache = service.ParseCache()
+    dumps = [cache.get(filename, library) for filename, library in sources]
+    autodoc.load_stores(dumps, IdentifierTable())
+    loaded = autodoc.dump_stores(), {key: dict(value) for key, value in autodoc.type_links.items()}
+
+    assert loaded == parsed
+    assert parsed[0]['entities'] and parsed[0]['instances'] and parsed[1]
+
+
+def test_fetch_falls_back_on_invalid_dump(sources, tmp_path):
+    path = str(tmp_path / 'service.sock')
+
+    def serve(server_socket):
+        connection, _ = server_socket.accept()
+        with connection, connection.makefile('rb') as stream:
+            stream.readline()
+            response = {'version': service.PROTOCOL_VERSION, 'stores': [{'entities': {'work.x': []}}]}
+            connection.sendall(json.dumps(response).encode() + b'\n')
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server_socket:
+        server_socket.bind(path)
+        server_socket.listen(1)
+        thread = threading.Thread(target=serve, args=(server_socket,))
+        thread.start()
+        assert not service.fetch(path, sources, IdentifierTable())
+        thread.join()
+
+    assert not autodoc.entities
+    os.remove(path)
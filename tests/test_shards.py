@@ -0,0 +1,46 @@
+# test_shards.py: Tests of merging VHDL symbol shards of partial builds
+# Copyright (C) 2021 CESNET z.s.p.o.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import pytest
+
+from sphinxvhdl import shards
+
+
+def shard(refs: dict) -> dict:
+    return {'format': shards.SHARD_FORMAT, 'version': shards.SHARD_VERSION, 'refs': refs}
+
+
+def test_merge_shards():
+    first = shard({'entity': [['counter', 'counter', 'a', 'vhdl-entity-counter'], ['fifo', 'fifo', 'a', 'vhdl-entity-fifo']]})
+    second = shard({'entity': [['fifo', 'fifo', 'a', 'vhdl-entity-fifo'], ['adder', 'adder', 'b', 'vhdl-entity-adder']],
+                    'types': [['t_word', 'work.p.t_word', 'b', 'vhdl-type-work.p.t_word']]})
+
+    merged = shards.merge_shards([first, second])
+
+    assert merged['refs']['entity'] == [('adder', 'adder', 'b', 'vhdl-entity-adder'),
+                                        ('counter', 'counter', 'a', 'vhdl-entity-counter'),
+                                        ('fifo', 'fifo', 'a', 'vhdl-entity-fifo')]
+    assert merged['refs']['types'] == [('t_word', 'work.p.t_word', 'b', 'vhdl-type-work.p.t_word')]
+    assert merged['refs']['portsignal'] == []
+    assert shards.merge_shards([second, first]) == merged
+
+
+def test_shard_index_skips_own_documents():
+    index = shards.ShardIndex([shard({'entity': [['counter', 'counter', 'a', 'vhdl-entity-counter'],
+                                                 ['counter', 'lib2.counter', 'b', 'vhdl-entity-lib2.counter']]})],
+                              own_docs=['a'])
+
+    assert index.refs['entity']['counter'] == [('lib2.counter', ('b', 'vhdl-entity-lib2.counter'))]
+
+
+def test_read_shard(tmp_path):
+    path = tmp_path / 'shard.json'
+    shards.write_shard(str(path), shards.merge_shards([shard({'entity': [['fifo', 'fifo', 'a', 'vhdl-entity-fifo']]})]))
+
+    assert shards.read_shard(str(path))['refs']['entity'] == [['fifo', 'fifo', 'a', 'vhdl-entity-fifo']]
+
+    path.write_text('{"format": "sphinx-vhdl-shard", "version": 0}')
+    with pytest.raises(ValueError):
+        shards.read_shard(str(path))
@@ -0,0 +1,45 @@
+# test_symbols.py: Tests of the identifier table and the packed reference targets
+# Copyright (C) 2021 CESNET z.s.p.o.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import pickle
+
+from sphinxvhdl.symbols import IdentifierTable, SymbolRefs
+
+
+def add(refs: SymbolRefs, name: str, qualified_name: str, docname: str, anchor: str) -> None:
+    refs.add(refs.symbols.intern(name), refs.symbols.intern(qualified_name), docname, anchor)
+
+
+def targets(refs: SymbolRefs, name: str):
+    return [(refs.symbols.name(qualified_id), target) for qualified_id, target in refs[refs.symbols.lookup(name)]]
+
+
+def test_pickle_round_trip():
+    refs = SymbolRefs(IdentifierTable())
+    add(refs, 'CLK', 'counter', 'counter', 'vhdl-portsignal-counter-clk')
+    add(refs, 'clk', 'fifo', 'fifo', 'vhdl-portsignal-fifo-clk')
+    add(refs, 't_word', 'work.types', 'types', 'vhdl-type-work.types')
+    add(refs, 'my_int', 'my_int', 'types', 'custom-anchor')
+
+    loaded = pickle.loads(pickle.dumps(refs))
+
+    assert list(loaded.items()) == list(refs.items())
+    assert targets(loaded, 'Clk') == [('counter', ('counter', 'vhdl-portsignal-counter-clk')),
+                                      ('fifo', ('fifo', 'vhdl-portsignal-fifo-clk'))]
+    assert targets(loaded, 'my_int') == [('my_int', ('types', 'custom-anchor'))]
+    assert loaded.symbols.intern('missing') not in loaded
+
+    loaded.remove_doc('counter')
+    add(loaded, 'clk', 'counter', 'counter', 'vhdl-portsignal-counter-clk2')
+    loaded.remove_doc('types')
+
+    assert targets(loaded, 'clk') == [('fifo', ('fifo', 'vhdl-portsignal-fifo-clk')),
+                                      ('counter', ('counter', 'vhdl-portsignal-counter-clk2'))]
+    assert loaded.symbols.lookup('t_word') not in loaded
+    assert len(loaded) == 1
+
+    reloaded = pickle.loads(pickle.dumps(loaded))
+
+    assert list(reloaded.items()) == list(loaded.items())